@@ -0,0 +1,87 @@
+"""Edge relaxation throughput with the `Inf` sentinel vs. the float `inf` used by the graph
+algorithms in `util`, on raw relaxations and within `djikstra` on the same grid graph.
+
+Run with `PYTHONPATH=src python benchmarks/relaxation.py`.
+"""
+import random
+import timeit
+from collections import defaultdict
+from heapq import heappush
+from math import inf
+from typing import Dict, Iterable, List, Tuple
+
+import util
+
+N_NODES = 20_000
+N_EDGES = 200_000
+GRID_SIZE = 150
+
+Node = Tuple[int, int]
+
+
+def random_edges(seed: int = 0) -> List[Tuple[int, int]]:
+    rand = random.Random(seed)
+    return [(rand.randrange(N_NODES), rand.randrange(1, 100)) for _ in range(N_EDGES)]
+
+
+def relax_inf_subclass(edges: List[Tuple[int, int]]) -> Dict[int, int]:
+    distances: Dict[int, int] = defaultdict(util.Inf)
+    for node, dist in edges:
+        if dist < distances[node]:
+            distances[node] = dist
+    return distances
+
+
+def relax_float_inf(edges: List[Tuple[int, int]]) -> Dict[int, float]:
+    distances: Dict[int, float] = {}
+    for node, dist in edges:
+        if dist < distances.get(node, inf):
+            distances[node] = dist
+    return distances
+
+
+class InfSentinelState(util.DjikstraState[Node]):
+    """`DjikstraState` relaxing edges against the `Inf` sentinel rather than the float `inf`"""
+
+    def update_dists(self, node_dists: Iterable[Tuple[Node, int]], node: Node):
+        distances = self.distances
+        for n, dist in node_dists:
+            if dist < distances.get(n, util.INF):
+                distances[n] = dist
+                self.predecessors[n] = node
+                dist_estimated = dist if self.heuristic is None else dist + self.heuristic(n)
+                heappush(self.min_dist_heap, util.HeapItem(n, dist_estimated))
+
+
+def grid_graph(size: int) -> util.WeightedDiGraph[Node]:
+    rand = random.Random(0)
+    return {
+        (i, j): {
+            (i + di, j + dj): rand.randrange(1, 10)
+            for di, dj in ((0, 1), (1, 0), (0, -1), (-1, 0))
+            if 0 <= i + di < size and 0 <= j + dj < size
+        }
+        for i in range(size)
+        for j in range(size)
+    }
+
+
+def main(repeat: int = 5):
+    edges = random_edges()
+    assert relax_inf_subclass(edges) == relax_float_inf(edges)
+    for f in (relax_inf_subclass, relax_float_inf):
+        best = min(timeit.repeat(lambda: f(edges), number=1, repeat=repeat))
+        print(f"{f.__name__:>20}: {N_EDGES / best / 1e6:.2f}M relaxations/s")
+
+    graph = grid_graph(GRID_SIZE)
+    start, end = (0, 0), (GRID_SIZE - 1, GRID_SIZE - 1)
+    states = {"djikstra Inf": InfSentinelState, "djikstra float inf": util.DjikstraState}
+    paths = [state(graph, start, [end]).shortest_path(end) for state in states.values()]
+    assert paths[0] == paths[1]
+    for name, state in states.items():
+        best = min(timeit.repeat(lambda: state(graph, start, [end]), number=1, repeat=repeat))
+        print(f"{name:>20}: {best * 1e3:.1f}ms on a {GRID_SIZE}x{GRID_SIZE} grid")
+
+
+if __name__ == "__main__":
+    main()
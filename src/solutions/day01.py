@@ -1,6 +1,12 @@
-from functools import partial, reduce
-from itertools import chain
-from typing import IO, DefaultDict, Iterable, Iterator, Mapping
+from array import array
+from functools import cached_property, lru_cache, partial
+from itertools import chain, repeat
+from sys import maxsize
+from typing import IO, Generic, Iterable, Iterator, List, Mapping, Optional, Sized, Tuple, TypeVar
+
+from util import Trie, parallel_sum
+
+V = TypeVar("V")
 
 DIGITS = dict(zip(map(str, range(0, 10)), range(0, 10)))
 READABLE_DIGITS = {
@@ -14,46 +20,113 @@ READABLE_DIGITS = {
 }
 
 
-class Trie(DefaultDict[str, "Trie"]):
-    def __init__(self):
-        self.default_factory = Trie
-
-
-def to_trie(strings: Iterable[str]):
-    def update(trie: Trie, chars: Iterable[str]):
-        chars = iter(chars)
-        c = next(chars, None)
-        if c is not None:
-            subtrie = trie[c]
-            update(subtrie, chars)
-        return trie
-
-    return reduce(update, strings, Trie())
+class AhoCorasick(Generic[V]):
+    """Aho-Corasick automaton for a fixed set of patterns, compiled to a flat transition table
+    with `n_symbols` columns per state. Symbol 0 stands for any character not in a pattern."""
+
+    def __init__(self, patterns: Mapping[str, V]):
+        self.values = list(patterns.values())
+        self.lengths = list(map(len, patterns))
+        self.max_len = max(self.lengths, default=0)
+        self.symbols = {c: i for i, c in enumerate(sorted(set(chain(*patterns))), 1)}
+        self.n_symbols = n_symbols = len(self.symbols) + 1
+        trie = Trie(patterns)
+        ends: List[List[int]] = [[] for _ in range(trie.n_nodes)]
+        for ix, pattern in enumerate(patterns):
+            ends[trie.find(pattern)].append(ix)
+
+        table = array("i", repeat(0, trie.n_nodes * n_symbols))
+        fail = [0] * trie.n_nodes
+        outputs: List[Tuple[int, ...]] = [()] * trie.n_nodes
+        # trie nodes are numbered breadth-first, so `fail[state]` has a shorter depth than `state`
+        # and its row of the table and its outputs are complete by the time `state` is reached
+        for state in range(trie.n_nodes):
+            row, fail_row = state * n_symbols, fail[state] * n_symbols
+            suffix_outputs = outputs[fail[state]] if state else ()
+            outputs[state] = tuple(
+                sorted(
+                    chain(ends[state], suffix_outputs), key=self.lengths.__getitem__, reverse=True
+                )
+            )
+            children = {self.symbols[c]: child for c, child in trie.children(state)}
+            for symbol in range(n_symbols):
+                child = children.get(symbol)
+                if child is None:
+                    table[row + symbol] = table[fail_row + symbol] if state else 0
+                else:
+                    fail[child] = table[fail_row + symbol] if state else 0
+                    table[row + symbol] = child
+        self.table = table
+        self.outputs = outputs
+        self.patterns = list(patterns)
+
+    def _states(self, text: Iterable[str]) -> Iterator[int]:
+        table, n_symbols, symbol = self.table, self.n_symbols, self.symbols.get
+        state = 0
+        for c in text:
+            state = table[state * n_symbols + symbol(c, 0)]
+            yield state
+
+    def matches(self, text: Iterable[str]) -> Iterator[Tuple[int, V]]:
+        """All (start index, value) of matches in `text`, including overlapping ones, in order of
+        their end index"""
+        for i, state in enumerate(self._states(text)):
+            for ix in self.outputs[state]:
+                yield i - self.lengths[ix] + 1, self.values[ix]
+
+    def first(self, text: Iterable[str]) -> Optional[V]:
+        """Value of the longest match starting earliest in `text`, scanning only as far as
+        needed"""
+        best: Optional[V] = None
+        best_start = len(text) if isinstance(text, Sized) else maxsize
+        for i, state in enumerate(self._states(text)):
+            outputs = self.outputs[state]
+            if outputs:
+                ix = outputs[0]
+                start = i - self.lengths[ix] + 1
+                # a later match with the same start is longer
+                if start <= best_start:
+                    best, best_start = self.values[ix], start
+            if i + 2 - self.max_len > best_start:
+                break
+        return best
+
+    def first_end(self, text: Iterable[str]) -> Optional[V]:
+        """Value of the longest match ending earliest in `text`"""
+        ix = next(filter(None, map(self.outputs.__getitem__, self._states(text))), (None,))[0]
+        return None if ix is None else self.values[ix]
+
+    @cached_property
+    def reversed(self) -> "AhoCorasick[V]":
+        return AhoCorasick(dict(zip((p[::-1] for p in self.patterns), self.values)))
+
+    def last(self, text: str) -> Optional[V]:
+        """Value of the longest match starting latest in `text`, scanning from the end only as
+        far as needed"""
+        return self.reversed.first_end(reversed(text))
+
+
+def parse_line(digits: AhoCorasick[int], line: str) -> int:
+    first, last = digits.first(line), digits.last(line)
+    return 10 * first + last  # type: ignore
 
 
-def find_prefixes_in(strings: Trie, in_: str, offset: int = 0, prefix: str = "") -> Iterator[str]:
-    if prefix and not strings:
-        yield prefix
-    elif offset < len(in_):
-        next_ = in_[offset]
-        if next_ in strings:
-            yield from find_prefixes_in(strings[next_], in_, offset + 1, f"{prefix}{next_}")
-
-
-def find_strings(strings: Trie, in_: str) -> Iterator[str]:
-    return chain.from_iterable(find_prefixes_in(strings, in_, i) for i in range(len(in_)))
+def parse(input: Iterable[str], digits: Mapping[str, int]) -> Iterator[int]:
+    return map(partial(parse_line, AhoCorasick(digits)), map(str.strip, input))
 
 
-def parse_line(strings: Trie, digits: Mapping[str, int], line: str) -> int:
-    digits_ = list(find_strings(strings, line))
-    return int(f"{digits[digits_[0]]}{digits[digits_[-1]]}")
+@lru_cache(None)
+def digits_matcher(part_2: bool) -> AhoCorasick[int]:
+    return AhoCorasick(READABLE_DIGITS if part_2 else DIGITS)
 
 
-def parse(input: Iterable[str], digits: Mapping[str, int]) -> Iterator[int]:
-    return map(partial(parse_line, to_trie(digits), digits), map(str.strip, input))
+def line_value(part_2: bool, line: str) -> int:
+    return parse_line(digits_matcher(part_2), line.strip())
 
 
-def run(input: IO[str], part_2: bool = True) -> int:
+def run(input: IO[str], part_2: bool = True, workers: Optional[int] = None) -> int:
+    if workers is not None:
+        return parallel_sum(partial(line_value, part_2), input, workers)
     digits = READABLE_DIGITS if part_2 else DIGITS
     ints = parse(input, digits)
     return sum(ints)
@@ -62,10 +135,13 @@ def run(input: IO[str], part_2: bool = True) -> int:
 def test():
     import io
 
-    trie = to_trie(["foo", "for", "fort"])
-    assert list(find_prefixes_in(trie, "forty")) == ["fort"]
+    matcher = AhoCorasick(dict(zip(["he", "she", "his", "hers"], range(4))))
+    assert list(matcher.matches("ushers")) == [(1, 1), (2, 0), (2, 3)]
+    assert (matcher.first("ushers"), matcher.last("ushers")) == (1, 3)
+    assert matcher.first("hx") is None
 
     input_ = "foo0bar1\nthreeightsevenine10"
     f = io.StringIO
     assert run(f(input_), part_2=False) == 1 + 10
     assert run(f(input_), part_2=True) == 1 + 30
+    assert run(f(input_), part_2=True, workers=2) == 1 + 30
@@ -1,10 +1,35 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
 from functools import partial, reduce
+from itertools import compress, product
+from math import prod
 from operator import mul
-from typing import IO, DefaultDict, Iterable, Iterator, Literal, NamedTuple, Sequence, cast
+from typing import (
+    IO,
+    DefaultDict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
+
+from util import Buffer, FenwickTree2D, open_buffer, parallel_sum
 
 Color = Literal["red", "green", "blue"]
 Draw = DefaultDict[Color, int]
 
+COLORS: Sequence[Color] = ("red", "green", "blue")
+COUNTS = Draw(int, {"red": 12, "green": 13, "blue": 14})
+
+game_re = re.compile(rb"Game (\d+)|(\d+) (red|green|blue)")
+
 
 class Game(NamedTuple):
     id: int
@@ -38,15 +63,88 @@ def power(game: Game) -> int:
     return reduce(mul, filter(bool, fewest_satisfiable.values()))
 
 
-def run(input: IO[str], part_2: bool = True) -> int:
-    games = parse(input)
+class GameMaxima(NamedTuple):
+    """Per-game maximum count of each color, as columns aligned with `ids`"""
+
+    ids: array
+    red: array
+    green: array
+    blue: array
+
+    def color(self, color: Color) -> array:
+        return getattr(self, color)
+
+
+def parse_maxima(buffer: Buffer) -> GameMaxima:
+    """Single regex pass over a whole input"""
+    maxima = GameMaxima(*(array("q") for _ in range(4)))
+    columns = {color.encode(): maxima.color(color) for color in COLORS}
+    for match in game_re.finditer(buffer):
+        id_, count, color = match.groups()
+        if id_ is None:
+            column, count_ = columns[color], int(count)
+            if count_ > column[-1]:
+                column[-1] = count_
+        else:
+            maxima.ids.append(int(id_))
+            for column in columns.values():
+                column.append(0)
+    return maxima
+
+
+def possible(counts: Mapping[Color, int], maxima: GameMaxima) -> Iterator[bool]:
+    return map(all, zip(*(map(counts[c].__ge__, maxima.color(c)) for c in COLORS)))
+
+
+def powers(maxima: GameMaxima) -> Iterator[int]:
+    return (prod(filter(bool, counts)) for counts in zip(maxima.red, maxima.green, maxima.blue))
+
+
+def possible_id_sums(maxima: GameMaxima, limits: Sequence[Mapping[Color, int]]) -> List[int]:
+    """Sum of ids of possible games for each of `limits`. Queries are answered in order of their
+    red limit, with the games whose red maximum is within it added to a Fenwick tree over (green,
+    blue) maxima, so each costs O(log^2) rather than a scan over all games."""
+    greens, blues = sorted(set(maxima.green)), sorted(set(maxima.blue))
+    tree = FenwickTree2D(len(greens), len(blues))
+    games = sorted(zip(maxima.red, maxima.green, maxima.blue, maxima.ids))
+    results = [0] * len(limits)
+    n_added = 0
+    for ix in sorted(range(len(limits)), key=lambda i: limits[i]["red"]):
+        limit = limits[ix]
+        while n_added < len(games) and games[n_added][0] <= limit["red"]:
+            _, green, blue, id_ = games[n_added]
+            tree.add(bisect_left(greens, green), bisect_left(blues, blue), id_)
+            n_added += 1
+        rows, cols = bisect_right(greens, limit["green"]), bisect_right(blues, limit["blue"])
+        results[ix] = tree.prefix_sum(rows, cols)
+    return results
+
+
+def line_value(part_2: bool, line: str) -> int:
+    game = parse_line(line.strip())
+    if part_2:
+        return power(game)
+    else:
+        return game.id if is_possible(COUNTS, game) else 0
+
+
+def run(
+    input: IO[str],
+    part_2: bool = True,
+    workers: Optional[int] = None,
+    limits: Optional[Sequence[Mapping[Color, int]]] = None,
+) -> Union[int, List[int]]:
+    """With `limits`, answer part 1 for each of them in turn"""
+    if workers is not None and limits is None:
+        return parallel_sum(partial(line_value, part_2), input, workers)
+    with open_buffer(input) as buffer:
+        maxima = parse_maxima(buffer)
+    if limits is not None:
+        return possible_id_sums(maxima, limits)
     if part_2:
-        powers = map(power, games)
-        return sum(powers)
+        return sum(powers(maxima))
     else:
-        counts = Draw(int, {"red": 12, "green": 13, "blue": 14})
-        possible_games = filter(partial(is_possible, counts), games)
-        return sum(game.id for game in possible_games)
+        return sum(compress(maxima.ids, possible(COUNTS, maxima)))
 
 
 def test():
@@ -56,3 +154,15 @@ def test():
     f = io.StringIO
     assert run(f(input_), part_2=False) == 1
     assert run(f(input_), part_2=True) == 3**3 + 15
+    assert run(f(input_), part_2=False, workers=2) == 1
+    assert run(f(input_), part_2=True, workers=2) == 3**3 + 15
+    games = list(parse(f(input_)))
+    maxima = parse_maxima(input_.encode())
+    assert list(maxima.ids) == [1, 2] and list(maxima.red) == [3, 15]
+    assert list(possible(COUNTS, maxima)) == [is_possible(COUNTS, game) for game in games]
+    assert list(powers(maxima)) == list(map(power, games))
+
+    limits = [dict(zip(COLORS, counts)) for counts in product(range(0, 17, 3), repeat=3)]
+    assert run(f(input_), limits=limits) == [
+        sum(game.id for game in games if is_possible(Draw(int, limit), game)) for limit in limits
+    ]
@@ -1,77 +1,67 @@
-from functools import partial, reduce
-from itertools import chain, starmap, takewhile
-from operator import mul
-from typing import IO, Iterable, Iterator, List, Mapping, NamedTuple, Sequence
+import re
+from array import array
+from itertools import repeat
+from math import prod
+from typing import IO, Iterator, List, NamedTuple, Set
 
-from util import Grid, GridCoordinates, adjacent_coords, invert_relation
+from util import DenseGrid, FlatIndex, bitmask, read_grid, spans_adjacent_to
 
+GEAR = b"*"
+NO_LABEL = -1
 
-class PartNumber(NamedTuple):
-    coords: GridCoordinates
-    length: int
-    value: int
+number_re = re.compile(rb"\d+")
+symbol_re = re.compile(rb"[^\d.]")
+SYMBOLS = bytes(b for b in range(256) if symbol_re.fullmatch(bytes([b])))
 
 
-class Symbol(NamedTuple):
-    coords: GridCoordinates
-    value: str
+class NumberLabels(NamedTuple):
+    """The index in `values` of the number covering each cell, or NO_LABEL"""
 
+    labels: array
+    values: List[int]
 
-def part_numbers_in_row(row_ix: int, row: Sequence[str], col_ix: int = 0) -> Iterator[PartNumber]:
-    if col_ix < len(row):
-        if row[col_ix].isdigit():
-            digits = list(takewhile(str.isdigit, (row[i] for i in range(col_ix, len(row)))))
-            yield PartNumber((row_ix, col_ix), len(digits), int("".join(digits)))
-            yield from part_numbers_in_row(row_ix, row, col_ix + len(digits))
-        else:
-            yield from part_numbers_in_row(row_ix, row, col_ix + 1)
 
+def number_matches(grid: DenseGrid) -> Iterator[re.Match]:
+    for row_start in range(0, len(grid.data), grid.width):
+        yield from number_re.finditer(grid.data, row_start, row_start + grid.width)
 
-def part_numbers(grid: Grid[str]) -> Iterator[PartNumber]:
-    return chain.from_iterable(starmap(part_numbers_in_row, enumerate(grid)))
 
+def label_numbers(grid: DenseGrid) -> NumberLabels:
+    labels = array("i", repeat(NO_LABEL, len(grid.data)))
+    values: List[int] = []
+    for match in number_matches(grid):
+        start, stop = match.span()
+        labels[start:stop] = array("i", repeat(len(values), stop - start))
+        values.append(int(match.group()))
+    return NumberLabels(labels, values)
 
-def adjacent_symbols(grid: Grid, number: PartNumber) -> Iterator[Symbol]:
-    width, height = len(grid[0]), len(grid)
-    return (
-        Symbol((m, n), symbol)
-        for m, n in adjacent_coords(number.coords, width, height, number.length)
-        if (symbol := grid[m][n]) != "."
-    )
-
-
-def adjacent_to_symbol(grid: Grid, number: PartNumber) -> bool:
-    return next(adjacent_symbols(grid, number), None) is not None
 
+def adjacent_labels(grid: DenseGrid, labels: array, ix: FlatIndex) -> Set[int]:
+    return {label for n in grid.neighbors(ix, diagonal=True) if (label := labels[n]) != NO_LABEL}
 
-def adjacent_gears(grid: Grid, number: PartNumber) -> Iterator[Symbol]:
-    return filter(lambda sym: sym.value == "*", adjacent_symbols(grid, number))
 
+def part_number_sum(grid: DenseGrid) -> int:
+    """Sum of the numbers adjacent to a symbol, checked against a single dilation of the symbols"""
+    matches = list(number_matches(grid))
+    spans = [(divmod(match.start(), grid.width), len(match.group())) for match in matches]
+    symbols = bitmask(grid.data, SYMBOLS)
+    is_part = spans_adjacent_to(symbols, grid.width, grid.height, spans)
+    return sum(int(match.group()) for match, part in zip(matches, is_part) if part)
 
-def gear_number_adjacency(
-    grid: Grid, numbers: Iterable[PartNumber]
-) -> Mapping[Symbol, List[PartNumber]]:
-    number_to_gears = {number: adjacent_gears(grid, number) for number in numbers}
-    return {
-        gear: numbers
-        for gear, numbers in invert_relation(number_to_gears).items()
-        if len(numbers) == 2
-    }
 
-
-def gear_ratio(numbers: Iterable[PartNumber]) -> int:
-    return reduce(mul, (n.value for n in numbers))
+def gear_ratio_sum(grid: DenseGrid, numbers: NumberLabels) -> int:
+    gear_labels = (adjacent_labels(grid, numbers.labels, ix) for ix in grid.indices(GEAR))
+    return sum(
+        prod(map(numbers.values.__getitem__, labels)) for labels in gear_labels if len(labels) == 2
+    )
 
 
 def run(input: IO[str], part_2: bool = True) -> int:
-    grid: Grid[str] = list(map(str.strip, input))
-    numbers = part_numbers(grid)
+    grid = read_grid(input)
     if part_2:
-        gear_to_numbers = gear_number_adjacency(grid, numbers)
-        return sum(map(gear_ratio, gear_to_numbers.values()))
+        return gear_ratio_sum(grid, label_numbers(grid))
     else:
-        valid_numbers = filter(partial(adjacent_to_symbol, grid), numbers)
-        return sum(n.value for n in valid_numbers)
+        return part_number_sum(grid)
 
 
 _TEST_INPUT = """
@@ -90,6 +80,10 @@ _TEST_INPUT = """
 def test():
     import io
 
+    labels = label_numbers(DenseGrid.from_lines(_TEST_INPUT.splitlines()))
+    assert labels.values == [467, 114, 35, 633, 617, 58, 592, 755, 664, 598]
+    assert labels.labels[:10].tolist() == [0, 0, 0, -1, -1, 1, 1, 1, -1, -1]
+
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 4361
     assert run(f(_TEST_INPUT), part_2=True) == 467835
@@ -1,32 +1,58 @@
-from functools import partial, reduce
-from itertools import chain, repeat, starmap, takewhile
-from operator import add
-from typing import IO, Collection, Counter, Mapping, NamedTuple
+import re
+from array import array
+from bisect import bisect_right
+from functools import reduce
+from operator import or_
+from typing import IO, Iterable, NamedTuple, Optional, Sequence
 
-from util import iterate
+from util import Buffer, open_buffer, parallel_sum
+
+# a set of small non-negative ints, with bit n set for each member n
+NumberMask = int
+
+card_re = re.compile(rb"Card +(\d+):([^|]*)\|([^\n]*)")
 
 
 class Card(NamedTuple):
     id: int
-    winning: Collection[int]
-    drawn: Collection[int]
+    winning: NumberMask
+    drawn: NumberMask
+
+
+class CardMatches(NamedTuple):
+    ids: array
+    matches: array
+
+
+def number_mask(numbers: Iterable[int]) -> NumberMask:
+    return reduce(or_, map((1).__lshift__, numbers), 0)
 
 
 def num_won(card: Card) -> int:
-    return sum(1 for n in card.drawn if n in card.winning)
+    return (card.winning & card.drawn).bit_count()
 
 
-def score(card: Card) -> int:
-    num_won_ = num_won(card)
-    return 2 ** (num_won_ - 1) if num_won_ else 0
+def match_score(num_won_: int) -> int:
+    return 1 << (num_won_ - 1) if num_won_ else 0
 
 
-def play(id_to_card: Mapping[int, Card], id_to_count: Mapping[int, int]) -> Counter[int]:
-    def won_copies(id: int, count: int) -> Counter[int]:
-        won_ids = range(id + 1, id + 1 + num_won(id_to_card[id]))
-        return Counter(dict(zip(filter(id_to_card.__contains__, won_ids), repeat(count))))
+def score(card: Card) -> int:
+    return match_score(num_won(card))
+
 
-    return reduce(add, starmap(won_copies, id_to_count.items()))
+def total_cards(ids: Sequence[int], matches: Sequence[int]) -> int:
+    """Number of cards held once all copies are won, for cards sorted by id. Copies won by each
+    card are added to a difference array over the following cards, so this is a single pass."""
+    diff = [0] * (len(ids) + 1)
+    total = copies = 0
+    for i, (id_, num_won_) in enumerate(zip(ids, matches)):
+        copies += diff[i]
+        count = copies + 1
+        total += count
+        if num_won_:
+            diff[i + 1] += count
+            diff[bisect_right(ids, id_ + num_won_, i + 1)] -= count
+    return total
 
 
 def parse_card(s: str) -> Card:
@@ -34,19 +60,38 @@ def parse_card(s: str) -> Card:
     winning, drawn = rest.split("|", maxsplit=1)
     return Card(
         int(id_.split()[-1]),
-        set(map(int, winning.strip().split())),
-        set(map(int, drawn.strip().split())),
+        number_mask(map(int, winning.split())),
+        number_mask(map(int, drawn.split())),
     )
 
 
-def run(input: IO[str], part_2: bool = True) -> int:
-    cards = list(map(parse_card, input))
+def parse_matches(buffer: Buffer) -> CardMatches:
+    """Ids and match counts of all cards, in a single regex pass over a whole input"""
+    cards = CardMatches(array("q"), array("q"))
+    for match in card_re.finditer(buffer):
+        id_, winning, drawn = match.groups()
+        cards.ids.append(int(id_))
+        mask = number_mask(map(int, winning.split())) & number_mask(map(int, drawn.split()))
+        cards.matches.append(mask.bit_count())
+    return cards
+
+
+def card_score(line: str) -> int:
+    return score(parse_card(line))
+
+
+def run(input: IO[str], part_2: bool = True, workers: Optional[int] = None) -> int:
+    # copies won in part 2 depend on preceding cards, so only part 1 is parallelized
+    if workers is not None and not part_2:
+        return parallel_sum(card_score, input, workers)
+    with open_buffer(input) as buffer:
+        cards = parse_matches(buffer)
     if part_2:
-        id_to_card = {card.id: card for card in cards}
-        countss = takewhile(bool, iterate(partial(play, id_to_card), {i: 1 for i in id_to_card}))
-        return sum(chain.from_iterable((counts.values() for counts in countss)))
+        # a no-op sort for the usual input, which is in order of id
+        ids, matches = zip(*sorted(zip(*cards))) if cards.ids else ((), ())
+        return total_cards(ids, matches)
     else:
-        return sum(map(score, cards))
+        return sum(map(match_score, cards.matches))
 
 
 _TEST_INPUT = """
@@ -63,4 +108,12 @@ def test():
 
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 13
+    assert run(f(_TEST_INPUT), part_2=False, workers=2) == 13
     assert run(f(_TEST_INPUT), part_2=True) == 30
+    cards = list(map(parse_card, _TEST_INPUT.splitlines()))
+    assert parse_matches(_TEST_INPUT.encode()) == (
+        array("q", [card.id for card in cards]),
+        array("q", map(num_won, cards)),
+    )
+    # cards can only win copies of cards that exist
+    assert total_cards([1, 2, 4], [3, 1, 2]) == 1 + 2 + 2
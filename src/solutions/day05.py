@@ -1,9 +1,12 @@
-from bisect import bisect_right
-from functools import partial, reduce
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import reduce
 from itertools import chain, takewhile
-from typing import IO, Iterable, Iterator, List, Tuple
+from math import inf
+from operator import add, itemgetter
+from typing import IO, Iterable, Iterator, List, Optional, Sequence, Tuple, cast
 
-from util import chunked, iterate, parse_blocks
+from util import chunked, is_not_null, iterate, open_buffer, parallel_map, parse_blocks, text_blocks
 
 ID = int
 IDRange = range
@@ -11,103 +14,121 @@ MapRange = Tuple[IDRange, IDRange]
 Category = str
 
 
-class Map:
-    def __init__(self, source: Category, target: Category, ranges: Iterable[MapRange]):
-        self.source = source
-        self.target = target
-        self.ranges = sorted(ranges, key=lambda r: r[0].start)
-        self.starts = [range[0].start for range in self.ranges]
+class PiecewiseLinear:
+    """An increasing-by-segments function on ints: `x + offsets[i]` on `[breakpoints[i],
+    breakpoints[i + 1])`, and the identity below `breakpoints[0]`"""
+
+    def __init__(self, breakpoints: Iterable[int] = (), offsets: Iterable[int] = ()):
+        self.breakpoints = array("q")
+        self.offsets = array("q")
+        # drop breakpoints that don't change the offset
+        offset = 0
+        for breakpoint, next_offset in zip(breakpoints, offsets):
+            if next_offset != offset:
+                self.breakpoints.append(breakpoint)
+                self.offsets.append(next_offset)
+                offset = next_offset
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[MapRange]) -> "PiecewiseLinear":
+        """The function mapping each source range onto its target range and other ints to
+        themselves. Source ranges must not overlap."""
+        breakpoints: List[int] = []
+        offsets: List[int] = []
+        for source, target in sorted(filter(itemgetter(0), ranges), key=lambda r: r[0].start):
+            if breakpoints and breakpoints[-1] == source.start:
+                offsets[-1] = target.start - source.start
+            else:
+                breakpoints.append(source.start)
+                offsets.append(target.start - source.start)
+            breakpoints.append(source.stop)
+            offsets.append(0)
+        return cls(breakpoints, offsets)
 
     def __bool__(self):
-        return bool(self.ranges)
-
-    def __call__(self, item: ID):
-        ix = bisect_right(self.starts, item) - 1
-        if ix < 0:
-            return item
-        else:
-            source_range, target_range = self.ranges[ix]
-            return target_range[source_range.index(item)] if item in source_range else item
-
-
-def fill_ranges(map_ranges: Iterable[MapRange], min_: int, max_: int) -> List[MapRange]:
-    """Ensure the domain of a function defined by mapped ranges is total.
-    Results are sorted by range start"""
-    by_endpoint = sorted(map_ranges, key=lambda r: r[0].start)
-    if by_endpoint:
-        first = by_endpoint[0][0]
-        last = by_endpoint[-1][0]
-        return [
-            map_range
-            for map_range in chain(
-                [(range(min_, first.start), range(min_, first.start))],
-                chain.from_iterable(
-                    [
-                        (input, output),
-                        (range(input.stop, next_input.start), range(input.stop, next_input.start)),
-                    ]
-                    for (input, output), (next_input, _) in zip(by_endpoint, by_endpoint[1:])
-                ),
-                [by_endpoint[-1], (range(last.stop, max_), range(last.stop, max_))],
-            )
-            if map_range[0]
-        ]
-    else:
-        return [(range(min_, max_), range(min_, max_))]
-
-
-def ranges_overlap(output1: IDRange, range2: MapRange) -> bool:
-    input2, _ = range2
-    return (
-        (input2.start <= output1.start < input2.stop)
-        or (input2.start < output1.stop <= input2.stop)
-        or (output1.start <= input2.start < output1.stop)
-    )
-
-
-def overlapping_ranges(map_range: MapRange, ranges: Iterable[MapRange]) -> Iterable[MapRange]:
-    """Assumes `ranges` is sorted and total as in the output of `fill_ranges`"""
-    return filter(partial(ranges_overlap, map_range[1]), ranges)
+        return bool(self.breakpoints)
 
+    def __eq__(self, other):
+        return (
+            isinstance(other, PiecewiseLinear)
+            and self.breakpoints == other.breakpoints
+            and self.offsets == other.offsets
+        )
 
-def intersect_ranges(map_range1: MapRange, map_range2: MapRange) -> MapRange:
-    input1, output1 = map_range1
-    input2, output2 = map_range2
-    start = max(output1.start, input2.start)
-    stop = min(output1.stop, input2.stop) - 1
-    new_output = range(output2[input2.index(start)], output2[input2.index(stop)] + 1)
-    new_input = range(input1[output1.index(start)], input1[output1.index(stop)] + 1)
-    return new_input, new_output
+    def __call__(self, x: int) -> int:
+        ix = bisect_right(self.breakpoints, x) - 1
+        return x if ix < 0 else x + self.offsets[ix]
+
+    def map_all(self, xs: Sequence[int]) -> array:
+        """Values at all of `xs`, in one sweep over the breakpoints with `xs` in sorted order"""
+        result = array("q", xs)
+        breakpoints, offsets = self.breakpoints, self.offsets
+        ix, offset = 0, 0
+        for i in sorted(range(len(result)), key=result.__getitem__):
+            x = result[i]
+            while ix < len(breakpoints) and breakpoints[ix] <= x:
+                offset = offsets[ix]
+                ix += 1
+            result[i] = x + offset
+        return result
+
+    def segments(self) -> Iterator[Tuple[float, float, int]]:
+        """(start, stop, offset) of every segment, including the unbounded ones"""
+        starts = chain((-inf,), self.breakpoints)
+        stops = chain(self.breakpoints, (inf,))
+        return zip(starts, stops, chain((0,), self.offsets))
+
+    def then(self, other: "PiecewiseLinear") -> "PiecewiseLinear":
+        """The composition applying `self` and then `other`. The image of each segment of `self`
+        is split at the breakpoints of `other` it contains, found by bisection"""
+        breakpoints: List[int] = []
+        offsets: List[int] = []
+        other_breakpoints, other_offsets = other.breakpoints, other.offsets
+        for start, stop, offset in self.segments():
+            ix = bisect_right(other_breakpoints, start + offset)
+            if start > -inf:
+                breakpoints.append(int(start))
+                offsets.append(offset + (other_offsets[ix - 1] if ix else 0))
+            while ix < len(other_breakpoints) and other_breakpoints[ix] < stop + offset:
+                breakpoints.append(other_breakpoints[ix] - offset)
+                offsets.append(offset + other_offsets[ix])
+                ix += 1
+        return PiecewiseLinear(breakpoints, offsets)
+
+    def min_over(self, ids: IDRange) -> int:
+        """Minimum over a non-empty range; each segment is increasing, so this is the least of
+        the values at the range start and at the breakpoints within it"""
+        lo, hi = bisect_right(self.breakpoints, ids.start), bisect_left(self.breakpoints, ids.stop)
+        breakpoint_values = map(add, self.breakpoints[lo:hi], self.offsets[lo:hi])
+        return min(chain((self(ids.start),), breakpoint_values))
 
 
-def compose_range(ranges: Iterable[MapRange], map_range: MapRange) -> Iterable[MapRange]:
-    return map(partial(intersect_ranges, map_range), overlapping_ranges(map_range, ranges))
+class Map:
+    def __init__(self, source: Category, target: Category, function: PiecewiseLinear):
+        self.source = source
+        self.target = target
+        self.function = function
 
+    def __call__(self, item: ID) -> ID:
+        return self.function(item)
 
-def compose_ranges(
-    ranges1: Iterable[MapRange], ranges2: Iterable[MapRange], fill_input: bool = True
-) -> Iterable[MapRange]:
-    min_ = min(input.start for input, _ in chain(ranges1, ranges2))
-    max_ = max(input.stop for input, _ in chain(ranges1, ranges2))
-    ranges1 = fill_ranges(ranges1, min_, max_) if fill_input else ranges1
-    ranges2 = fill_ranges(ranges2, min_, max_)
-    return chain.from_iterable(map(partial(compose_range, ranges2), ranges1))
+    def map_all(self, items: Sequence[ID]) -> array:
+        return self.function.map_all(items)
 
 
-def compose_maps(map1: Map, map2: Map, fill_input: bool = True) -> Map:
+def compose_maps(map1: Map, map2: Map) -> Map:
     assert map1.target == map2.source
-    return Map(
-        map1.source, map2.target, compose_ranges(map1.ranges, map2.ranges, fill_input=fill_input)
-    )
+    return Map(map1.source, map2.target, map1.function.then(map2.function))
 
 
 def compose_all_maps(maps: Iterable[Map], start_type: Category) -> Map:
     source_to_map = {m.source: m for m in maps}
 
-    def next_map(map: Map) -> Map:
-        return source_to_map.get(map.target, Map("", "", []))
+    def next_map(map: Optional[Map]) -> Optional[Map]:
+        return None if map is None else source_to_map.get(map.target)
 
-    ordered_maps = takewhile(bool, iterate(next_map, source_to_map[start_type]))
+    first_map: Optional[Map] = source_to_map[start_type]
+    ordered_maps = cast(Iterator[Map], takewhile(is_not_null, iterate(next_map, first_map)))
     return reduce(compose_maps, ordered_maps)
 
 
@@ -121,7 +142,7 @@ def parse_map(block: str) -> Map:
     header = lines[0]
     cat1, _, cat2_ = header.split("-", maxsplit=2)
     cat2 = cat2_.split(maxsplit=1)[0]
-    return Map(cat1, cat2, map(parse_range, lines[1:]))
+    return Map(cat1, cat2, PiecewiseLinear.from_ranges(map(parse_range, lines[1:])))
 
 
 def parse(input: Iterable[str]) -> Iterator[Map]:
@@ -138,21 +159,19 @@ def parse_ranges(line: str) -> Iterable[IDRange]:
     return (range(start, start + size) for start, size in chunked(2, seeds))
 
 
-def run(input: IO[str], part_2: bool = True) -> int:
-    lines = iter(input)
-    seeds_line = next(lines)
-    maps = parse_blocks(lines, parse_map)
+def run(
+    input: IO[str], part_2: bool = True, workers: Optional[int] = None, chunksize: int = 1
+) -> int:
+    with open_buffer(input) as buffer:
+        blocks = text_blocks(buffer)
+        seeds_line = next(blocks)
+        # there are only a handful of maps, each with many ranges; by default each is its own task
+        maps = list(parallel_map(parse_map, blocks, workers, chunksize))
     final_map = compose_all_maps(maps, "seed")
     if part_2:
-        seed_ranges = list(parse_ranges(seeds_line))
-        final_map = compose_maps(
-            Map("seed", "seed", zip(seed_ranges, seed_ranges)), final_map, fill_input=False
-        )
-        seeds = final_map.starts
+        return min(map(final_map.function.min_over, parse_ranges(seeds_line)))
     else:
-        seeds = parse_seeds(seeds_line)
-
-    return min(map(final_map, seeds))
+        return min(final_map.map_all(parse_seeds(seeds_line)))
 
 
 _TEST_INPUT = """
@@ -197,3 +216,26 @@ def test():
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 35
     assert run(f(_TEST_INPUT), part_2=True) == 46
+    assert run(f(_TEST_INPUT), part_2=True, workers=2) == 46
+    # a map that is the identity everywhere doesn't end the chain
+    identity_input = "seeds: 1 3\n\n" + "\n\n".join(
+        f"{source}-to-{target} map:\n{ranges}"
+        for source, target, ranges in [
+            ("seed", "soil", "50 0 10"),
+            ("soil", "water", "50 50 10"),
+            ("water", "location", "0 50 10"),
+        ]
+    )
+    assert run(f(identity_input), part_2=False) == 1
+    assert run(f(identity_input), part_2=True) == 1
+
+    f1 = PiecewiseLinear.from_ranges(
+        [(range(10, 20), range(0, 10)), (range(20, 25), range(50, 55))]
+    )
+    f2 = PiecewiseLinear.from_ranges([(range(5, 12), range(100, 107))])
+    composed = f1.then(f2)
+    assert all(composed(x) == f2(f1(x)) for x in range(-5, 40))
+    assert f1.min_over(range(5, 30)) == 0 and f1.min_over(range(22, 24)) == 52
+    xs = [30, -1, 15, 22, 10, 15, 9]
+    assert list(composed.map_all(xs)) == list(map(composed, xs))
+    assert f1.min_over(range(3, 30)) == 0 and f2.min_over(range(2, 20)) == 2
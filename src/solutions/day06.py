@@ -1,6 +1,5 @@
-from functools import reduce
-from math import ceil, floor, sqrt
-from operator import itemgetter, mul
+from math import isqrt, prod
+from operator import itemgetter
 from typing import IO, Iterable, List, Sequence, Tuple
 
 ChargeTime = int
@@ -8,17 +7,34 @@ Distance = int
 Record = Tuple[ChargeTime, Distance]
 
 
+def first_winning_charge(time: ChargeTime, best_dist: Distance) -> ChargeTime:
+    """Least charge with (time - charge) * charge > best_dist, or one past time / 2 if there is
+    none. The winning charges are symmetric about time / 2, so this determines all of them."""
+    # charge^2 - charge*time + best_dist < 0 between the roots (time -+ sqrt(discriminant)) / 2
+    discriminant = time * time - 4 * best_dist
+    if discriminant < 0:
+        return time // 2 + 1
+    charge = max((time - isqrt(discriminant)) // 2, 0)
+    # the integer root is within 1 of the exact one; step to the boundary
+    while charge <= time // 2 and (time - charge) * charge <= best_dist:
+        charge += 1
+    while charge > 0 and (time - charge + 1) * (charge - 1) > best_dist:
+        charge -= 1
+    return charge
+
+
 def winning_strategies(record: Record) -> Sequence[ChargeTime]:
     time, best_dist = record
-    # solve (time - charge) * charge > best_dist for charge
-    # charge^2 - charge*time + best_dist < 0
-    b, c = -time, best_dist
-    discriminant = sqrt(b**2 - 4 * c)
-    int_discriminant = int(discriminant)
-    is_int = float(int_discriminant) == discriminant and (int_discriminant % 2) == (b % 2)
-    lo = (-discriminant - b) / 2
-    hi = (discriminant - b) / 2
-    return range(int(ceil(lo)) + is_int, int(floor(hi)) + 1 - is_int)
+    lo = first_winning_charge(time, best_dist)
+    return range(lo, time - lo + 1)
+
+
+def winning_counts(times: Iterable[ChargeTime], best_dists: Iterable[Distance]) -> List[int]:
+    """Number of winning charges for each of many races"""
+    return [
+        max(time - 2 * first_winning_charge(time, dist) + 1, 0)
+        for time, dist in zip(times, best_dists)
+    ]
 
 
 def parse(lines: Iterable[str]) -> List[Record]:
@@ -35,8 +51,8 @@ def run(input: IO[str], part_2: bool = True) -> int:
         dist = int("".join(map(str, map(itemgetter(1), records))))
         return len(winning_strategies((time, dist)))
     else:
-        strategies = map(winning_strategies, records)
-        return reduce(mul, map(len, strategies))
+        times, dists = zip(*records)
+        return prod(winning_counts(times, dists))
 
 
 _TEST_INPUT = """
@@ -51,3 +67,11 @@ def test():
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 288
     assert run(f(_TEST_INPUT), part_2=True) == 71503
+    # exact at boundaries, and for values beyond float precision
+    races = [(7, 9), (30, 200), (4, 4), (4, 3), (0, 0), (3, 10), (10**20 + 1, 10**39)]
+    brute_force = [sum(1 for c in range(t + 1) if (t - c) * c > d) for t, d in races[:-1]]
+    assert winning_counts(*zip(*races))[:-1] == brute_force
+    time, dist = races[-1]
+    strategies = winning_strategies((time, dist))
+    assert (strategies[0] - 1) * (time - strategies[0] + 1) <= dist
+    assert strategies[0] * (time - strategies[0]) > dist
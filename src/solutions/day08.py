@@ -1,13 +1,13 @@
-from functools import partial, reduce
-from itertools import count, cycle, takewhile
-from typing import IO, Iterable, Iterator, List, Literal, Mapping, Sequence, Tuple
+from functools import partial
+from itertools import cycle, product, takewhile
+from typing import IO, Callable, Iterable, Iterator, List, Literal, Mapping, Sequence, Tuple
 
-from util import chunked, iterate, lcm
+from util import Congruence, StateCycle, chunked, find_cycle, identity, iterate, solve_congruences
 
 Node = str
 Network = Mapping[Node, Tuple[Node, Node]]
 Instruction = Literal[0, 1]
-Congruence = int
+GhostState = Tuple[int, Node]
 
 SYMBOL_TO_INSTRUCTION: Mapping[str, Instruction] = {"L": 0, "R": 1}
 START: Node = "AAA"
@@ -36,21 +36,47 @@ def traverse(instructions: Iterator[Instruction], node_map: Network, node: Node)
     return iterate(partial(next_node, instructions, node_map), node)
 
 
-def find_cycle(
-    instructions: Sequence[Instruction],
-    node_map: Network,
-    node: Node,
-) -> Congruence:
-    seen = {}
-    n_instructions = len(instructions)
-    for i, node in zip(count(0), traverse(cycle(instructions), node_map, node)):
-        j = i % n_instructions
-        if (j, node) in seen:
-            return i - j
-        else:
-            seen[(j, node)] = i
-    else:
-        return i
+def ghost_states(
+    instructions: Sequence[Instruction], node_map: Network, node: Node
+) -> StateCycle[GhostState]:
+    """(instruction index, node) at each step; these are eventually periodic"""
+    states = zip(cycle(range(len(instructions))), traverse(cycle(instructions), node_map, node))
+    return find_cycle(identity, states)
+
+
+def end_congruences(
+    is_end: Callable[[Node], bool], ghost: StateCycle[GhostState]
+) -> List[Congruence]:
+    period = len(ghost.cycle)
+    return [
+        Congruence(ghost.offset + i, period)
+        for i, (_, node) in enumerate(ghost.cycle)
+        if is_end(node)
+    ]
+
+
+def first_common_end(
+    is_end: Callable[[Node], bool], ghosts: Sequence[StateCycle[GhostState]]
+) -> int:
+    def all_at_end(step: int) -> bool:
+        return all(is_end(ghost[step][1]) for ghost in ghosts)
+
+    # any common end before all ghosts are in their cycles is an end in some ghost's prefix
+    prefix_ends = sorted(
+        i for ghost in ghosts for i, (_, node) in enumerate(ghost.prefix) if is_end(node)
+    )
+    first = next(filter(all_at_end, prefix_ends), None)
+    if first is not None:
+        return first
+    # otherwise, every combination of in-cycle ends is a system of congruences
+    start = max(ghost.offset for ghost in ghosts)
+    solutions = filter(
+        None, map(solve_congruences, product(*(end_congruences(is_end, g) for g in ghosts)))
+    )
+    first = min((c.first_at_least(start) for c in solutions), default=None)
+    if first is None:
+        raise ValueError("Ghosts are never all at an end node at the same step")
+    return first
 
 
 def parse_node(s: str) -> Tuple[Node, Tuple[Node, Node]]:
@@ -79,8 +105,8 @@ def run(input: IO[str], part_2: bool = True) -> int:
 
         start_nodes = filter(partial(endswith, START[0]), node_map)
         is_end = partial(endswith, END[0])
-        cycle_lens = map(partial(find_cycle, instructions, node_map, is_end), start_nodes)
-        return reduce(lcm, cycle_lens)
+        ghosts = [ghost_states(instructions, node_map, node) for node in start_nodes]
+        return first_common_end(is_end, ghosts)
     else:
         steps = takewhile(END.__ne__, traverse(cycle(instructions), node_map, START))
         return sum(1 for _ in steps)
@@ -105,6 +131,20 @@ LR
 22Z = (22B, 22B)
 XXX = (XXX, XXX)""".strip()
 
+_TEST_INPUT_3 = """
+L
+
+11A = (11B, XXX)
+11B = (11Z, XXX)
+11Z = (11B, XXX)
+22A = (2BZ, XXX)
+2BZ = (22C, XXX)
+22C = (22D, XXX)
+22D = (22E, XXX)
+22E = (22Z, XXX)
+22Z = (22D, XXX)
+XXX = (XXX, XXX)""".strip()
+
 
 def test():
     import io
@@ -112,3 +152,12 @@ def test():
     f = io.StringIO
     assert run(f(_TEST_INPUT_1), part_2=False) == 6
     assert run(f(_TEST_INPUT_2), part_2=True) == 6
+    # ghost 22 passes an end in its prefix, then cycles with period 3 from step 3
+    assert run(f(_TEST_INPUT_3), part_2=True) == 8
+    # ends at even steps only, and at odd steps only
+    try:
+        run(f(_TEST_INPUT_3.replace("22Z = (22D", "22Z = (22E")), part_2=True)
+    except ValueError:
+        pass
+    else:
+        assert False, "expected ValueError"
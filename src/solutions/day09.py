@@ -3,9 +3,9 @@ from functools import partial, reduce
 from itertools import repeat, takewhile
 from numbers import Rational
 from operator import mul, sub
-from typing import IO, List, Tuple, TypeVar
+from typing import IO, List, Optional, Tuple, TypeVar
 
-from util import iterate
+from util import iterate, parallel_sum
 
 N = TypeVar("N", bound=Rational)
 Series = List[int]
@@ -68,7 +68,14 @@ def parse_series(line: str) -> Series:
     return list(map(int, line.strip().split()))
 
 
-def run(input: IO[str], part_2: bool = True) -> int:
+def extrapolate(part_2: bool, line: str) -> int:
+    series = parse_series(line)
+    return int(evaluate(solve_polynomial(series), -1 if part_2 else len(series)))
+
+
+def run(input: IO[str], part_2: bool = True, workers: Optional[int] = None) -> int:
+    if workers is not None:
+        return parallel_sum(partial(extrapolate, part_2), input, workers)
     series = list(map(parse_series, input))
     polys = map(solve_polynomial, series)
     xs = repeat(-1, len(series)) if part_2 else map(len, series)
@@ -88,3 +95,4 @@ def test():
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 114
     assert run(f(_TEST_INPUT), part_2=True) == 2
+    assert run(f(_TEST_INPUT), part_2=True, workers=2) == 2
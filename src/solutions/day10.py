@@ -1,21 +1,35 @@
+from array import array
 from functools import partial
-from itertools import chain, filterfalse, product, takewhile
+from itertools import chain, filterfalse, starmap, takewhile
 from operator import itemgetter
-from typing import IO, Callable, Dict, Iterable, Iterator, Mapping, Set, Tuple
-
-from util import Grid, GridCoordinates, adjacent_coords, any_, compose, index, iterate, translate
+from typing import IO, Dict, Iterable, Iterator, Mapping, Sequence, Set, Tuple
+
+from util import (
+    NO_NEIGHBOR,
+    DenseGrid,
+    FlatIndex,
+    GridCoordinates,
+    direction_offsets,
+    iterate,
+    neighbor_table,
+    read_grid,
+)
 
 Tile = str
 GridStep = Tuple[GridCoordinates, GridCoordinates]
-PathTransitions = Mapping[GridCoordinates, GridCoordinates]
+FlatStep = Tuple[FlatIndex, FlatIndex]
+# flat index of a corner of a grid cell, in a grid 1 larger in each dimension
+HalfGridIndex = int
+HalfGridEdge = Tuple[HalfGridIndex, HalfGridIndex]
+NeighborTable = Sequence[array]
+# flat index offsets of the 2 cells connected by each pipe tile
+TileOffsets = Mapping[int, Tuple[int, int]]
 
 START: Tile = "S"
 U: GridCoordinates = (-1, 0)
 D: GridCoordinates = (1, 0)
 L: GridCoordinates = (0, -1)
 R: GridCoordinates = (0, 1)
-UL: GridCoordinates = (-1, -1)
-DR: GridCoordinates = (1, 1)
 
 STEPS: Dict[Tile, GridStep] = {
     "|": (U, D),
@@ -27,122 +41,120 @@ STEPS: Dict[Tile, GridStep] = {
 }
 
 
-def find_start(grid: Grid[Tile]) -> GridCoordinates:
-    return next(
-        (i, j) for i, j in product(range(len(grid)), range(len(grid[0]))) if grid[i][j] == START
-    )
+def tile_offsets(width: int) -> TileOffsets:
+    up, left, down, right = direction_offsets(width)
+    offsets = {U: up, L: left, D: down, R: right}
+    return {ord(tile): (offsets[s1], offsets[s2]) for tile, (s1, s2) in STEPS.items()}
+
+
+def find_start(grid: DenseGrid) -> FlatIndex:
+    return grid.data.index(START.encode())
 
 
-def step(grid: Grid[str], step: GridStep) -> GridStep:
-    prior_coords, coords = step
-    tile = index(grid, coords)
-    steps = STEPS[tile]
-    next_coords = next(filter(prior_coords.__ne__, map(partial(translate, coords), steps)))
-    return coords, next_coords
+def step(grid: DenseGrid, offsets: TileOffsets, step: FlatStep) -> FlatStep:
+    prior_ix, ix = step
+    offset1, offset2 = offsets[grid.data[ix]]
+    next_ix = ix + offset1
+    return ix, (ix + offset2 if next_ix == prior_ix else next_ix)
 
 
-def is_adjacent(grid: Grid, coords1: GridCoordinates, coords2: GridCoordinates) -> bool:
-    tile = index(grid, coords2)
-    steps = STEPS.get(tile, ())
-    return any(map(coords1.__eq__, map(partial(translate, coords2), steps)))
+def is_adjacent(grid: DenseGrid, offsets: TileOffsets, ix1: FlatIndex, ix2: FlatIndex) -> bool:
+    return ix1 in (ix2 + offset for offset in offsets.get(grid.data[ix2], ()))
 
 
 def traverse(
-    grid: Grid, start: GridCoordinates, next: GridCoordinates
-) -> Iterator[GridCoordinates]:
-    steps = iterate(partial(step, grid), (start, next))
-    coords = map(itemgetter(1), steps)
-    return chain((start,), takewhile(start.__ne__, coords))
+    grid: DenseGrid, offsets: TileOffsets, start: FlatIndex, next: FlatIndex
+) -> Iterator[FlatIndex]:
+    steps = iterate(partial(step, grid, offsets), (start, next))
+    ixs = map(itemgetter(1), steps)
+    return chain((start,), takewhile(start.__ne__, ixs))
 
 
-def half_grid_neighbors(
-    boundary: PathTransitions, half_grid_coords: GridCoordinates
-) -> Iterator[GridCoordinates]:
-    # grid neighbors of a half-grid point without passing through the boundary
-    grid_neighbors_ = list(map(partial(translate, half_grid_coords), (U, UL, L)))
-    for nbr1, nbr2, step in zip(
-        chain((half_grid_coords,), grid_neighbors_),
-        chain(grid_neighbors_, (half_grid_coords,)),
-        (R, U, L, D),
-    ):
-        if boundary.get(nbr1) != nbr2 and boundary.get(nbr2) != nbr1:
-            yield translate(half_grid_coords, step)
+def loop_edges(grid: DenseGrid, loop: Iterable[FlatIndex]) -> Set[HalfGridEdge]:
+    """The half-grid steps crossing the loop, between corners of consecutive loop cells"""
+    width = grid.width + 1
+    loop_ = list(loop)
 
+    def edge(ix1: FlatIndex, ix2: FlatIndex) -> HalfGridEdge:
+        i, j = grid.coords(min(ix1, ix2))
+        if abs(ix1 - ix2) == 1:
+            corner = i * width + j + 1
+            return corner, corner + width
+        else:
+            corner = (i + 1) * width + j
+            return corner, corner + 1
+
+    return set(starmap(edge, zip(loop_, chain(loop_[1:], loop_[:1]))))
 
-def half_grid_shell(
-    boundary: PathTransitions, seeds: Set[GridCoordinates]
-) -> Iterator[GridCoordinates]:
-    return chain.from_iterable(map(partial(half_grid_neighbors, boundary), seeds))
 
+def half_grid_neighbors(
+    table: NeighborTable, boundary: Set[HalfGridEdge], ix: HalfGridIndex
+) -> Iterator[HalfGridIndex]:
+    # half-grid neighbors of a half-grid point without passing through the boundary
+    for direction in table:
+        nbr = direction[ix]
+        if nbr != NO_NEIGHBOR and (min(ix, nbr), max(ix, nbr)) not in boundary:
+            yield nbr
 
-def boundary_condition(width: int, height: int) -> Callable[[GridCoordinates], bool]:
-    return any_(
-        compose(itemgetter(0), (0).__gt__),
-        compose(itemgetter(1), (0).__gt__),
-        compose(itemgetter(0), height.__le__),
-        compose(itemgetter(1), width.__le__),
-    )
+
+def half_grid_shell(
+    table: NeighborTable, boundary: Set[HalfGridEdge], seeds: Set[HalfGridIndex]
+) -> Iterator[HalfGridIndex]:
+    return chain.from_iterable(map(partial(half_grid_neighbors, table, boundary), seeds))
 
 
 def reachable_half_grid_points(
-    grid: Grid[str], boundary: PathTransitions, half_grid_seed: GridCoordinates
-) -> Set[GridCoordinates]:
-    boundary_condition_ = boundary_condition(len(grid[0]) + 1, len(grid) + 1)
-    prior_coords: Set[GridCoordinates] = set()
-
-    def next_shell(prior_shell: Set[GridCoordinates]):
-        shell = set(half_grid_shell(boundary, prior_shell))
-        shell = set(filterfalse(any_(prior_coords.__contains__, boundary_condition_), shell))
-        prior_coords.update(shell)
+    table: NeighborTable, boundary: Set[HalfGridEdge], half_grid_seed: HalfGridIndex
+) -> Set[HalfGridIndex]:
+    prior_ixs: Set[HalfGridIndex] = set()
+
+    def next_shell(prior_shell: Set[HalfGridIndex]):
+        shell = set(
+            filterfalse(prior_ixs.__contains__, half_grid_shell(table, boundary, prior_shell))
+        )
+        prior_ixs.update(shell)
         return shell
 
     shells = takewhile(bool, iterate(next_shell, {half_grid_seed}))
     return set(chain.from_iterable(shells))
 
 
-def reachable_regions(grid: Grid[str], boundary: PathTransitions, visited: Set[GridCoordinates]):
-    height, width = len(grid), len(grid[0])
-    next_seeds = filterfalse(visited.__contains__, product(range(height), range(width)))
-    while next_seed := next(next_seeds, None):
-        region = reachable_half_grid_points(grid, boundary, next_seed)
+def reachable_regions(
+    table: NeighborTable, boundary: Set[HalfGridEdge], visited: Set[HalfGridIndex]
+) -> Iterator[Set[HalfGridIndex]]:
+    next_seeds = filterfalse(visited.__contains__, range(len(table[0])))
+    while (next_seed := next(next_seeds, None)) is not None:
+        region = reachable_half_grid_points(table, boundary, next_seed)
         visited.update(region)
         yield region
 
 
-def num_grid_points(half_grid_coords: Set[GridCoordinates]) -> int:
-    def is_grid_point(coords: GridCoordinates) -> bool:
-        return all(
-            map(compose(partial(translate, coords), half_grid_coords.__contains__), (R, D, DR))
-        )
-
-    return sum(1 for _ in filter(is_grid_point, half_grid_coords))
-
+def num_grid_points(width: int, half_grid_ixs: Set[HalfGridIndex]) -> int:
+    # grid points whose 4 corners all lie in the region; `width` is that of the half grid
+    def is_grid_point(ix: HalfGridIndex) -> bool:
+        return all(ix + offset in half_grid_ixs for offset in (1, width, width + 1))
 
-def parse(lines: Iterable[str]) -> Grid[Tile]:
-    return list(map(str.strip, lines))
+    return sum(1 for _ in filter(is_grid_point, half_grid_ixs))
 
 
-def to_transition_map(loop: Iterable[GridCoordinates]) -> PathTransitions:
-    loop_ = list(loop)
-    return dict(zip(loop_, chain(loop_[1:], loop_[:1])))
+def parse(input: IO[str]) -> DenseGrid:
+    return read_grid(input)
 
 
 def run(input: IO[str], part_2: bool = True) -> int:
     grid = parse(input)
+    offsets = tile_offsets(grid.width)
     start = find_start(grid)
-    first = next(
-        filter(
-            partial(is_adjacent, grid, start),
-            adjacent_coords(start, len(grid[0]), len(grid[1])),
-        )
-    )
-    loop = traverse(grid, start, first)
+    first = next(filter(partial(is_adjacent, grid, offsets, start), grid.neighbors(start)))
+    loop = traverse(grid, offsets, start, first)
     if part_2:
-        transitions = to_transition_map(loop)
-        # (0, 0) is the first half-grid seed coordinate and is always on the outside;
+        # the half grid has a point at each corner of each grid cell
+        width, height = grid.width + 1, grid.height + 1
+        boundary = loop_edges(grid, loop)
+        # 0 is the first half-grid seed index and is always on the outside;
         # furthermore, there are only 2 regions in the half-grid: inside and outside.
-        outside, inside = reachable_regions(grid, transitions, set())
-        return num_grid_points(inside)
+        outside, inside = reachable_regions(neighbor_table(width, height), boundary, set())
+        return num_grid_points(width, inside)
     else:
         len_ = sum(1 for _ in loop)
         return len_ // 2
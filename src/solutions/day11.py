@@ -1,25 +1,24 @@
 from functools import partial
-from itertools import combinations, product, starmap
-from operator import itemgetter
-from typing import IO, Iterable, Iterator, Sequence, Set
+from itertools import combinations, starmap
+from typing import IO, Iterator, Set
 
-from util import Grid, GridCoordinates, compose, index, manhattan_distance
+from util import DenseGrid, GridCoordinates, compose, manhattan_distance, read_grid
 
-Space = str
-GALAXY = "#"
-EMPTY = "."
+Space = bytes
+GALAXY: Space = b"#"
+EMPTY: Space = b"."
 
 
-def row(grid: Grid[Space], i: int) -> Sequence[Space]:
-    return grid[i]
+def row(grid: DenseGrid, i: int) -> memoryview:
+    return grid.row(i)
 
 
-def column(grid: Grid[Space], i: int) -> Iterable[Space]:
-    return map(itemgetter(i), grid)
+def column(grid: DenseGrid, i: int) -> memoryview:
+    return grid.column(i)
 
 
-def is_empty(row_or_col: Iterable[Space]) -> bool:
-    return all(map(EMPTY.__eq__, row_or_col))
+def is_empty(row_or_col: memoryview) -> bool:
+    return GALAXY[0] not in row_or_col
 
 
 def dist(
@@ -41,21 +40,18 @@ def dist(
     return initial_dist + extra_x_dist + extra_y_dist
 
 
-def galaxy_coords(space: Grid[Space]) -> Iterator[GridCoordinates]:
-    return filter(
-        compose(partial(index, space), GALAXY.__eq__),
-        product(range(len(space)), range(len(space[0]))),
-    )
+def galaxy_coords(space: DenseGrid) -> Iterator[GridCoordinates]:
+    return map(space.coords, space.indices(GALAXY))
 
 
-def parse(input: Iterable[str]) -> Grid[Space]:
-    return list(map(str.strip, input))
+def parse(input: IO[str]) -> DenseGrid:
+    return read_grid(input)
 
 
 def run(input: IO[str], part_2: bool = True) -> int:
     space = parse(input)
-    empty_rows = set(filter(compose(partial(row, space), is_empty), range(len(space))))
-    empty_cols = set(filter(compose(partial(column, space), is_empty), range(len(space[0]))))
+    empty_rows = set(filter(compose(partial(row, space), is_empty), range(space.height)))
+    empty_cols = set(filter(compose(partial(column, space), is_empty), range(space.width)))
     distance = partial(dist, empty_rows, empty_cols, 1_000_000 if part_2 else 2)
     galaxies = galaxy_coords(space)
     galaxy_pairs = combinations(galaxies, 2)
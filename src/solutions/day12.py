@@ -1,6 +1,6 @@
-from collections import deque
-from itertools import chain
-from typing import IO, Iterable, Iterator, Literal, NamedTuple, Sequence, cast
+from typing import IO, Iterable, Iterator, Literal, NamedTuple, Optional, Sequence, cast
+
+from util import parallel_sum, sliding_all
 
 State = Literal["?", "#", "."]
 UNKNOWN: State = "?"
@@ -15,16 +15,15 @@ class Record(NamedTuple):
 
 def active_placements(states: Sequence[State], n_active: int) -> Iterator[int]:
     if len(states) >= n_active:
-        window = deque(chain((INACTIVE,), states[:n_active]))
-        for i, after in enumerate(chain(states[n_active:], (INACTIVE,))):
-            before = window.popleft()
+        fits = sliding_all(n_active, map((UNKNOWN, OPERATIONAL).__contains__, states))
+        padded = (INACTIVE, *states, INACTIVE)
+        for i, fits_ in enumerate(fits):
             if (
-                before in (INACTIVE, UNKNOWN)
-                and after in (INACTIVE, UNKNOWN)
-                and all(map((UNKNOWN, OPERATIONAL).__contains__, window))
+                fits_
+                and padded[i] in (INACTIVE, UNKNOWN)
+                and padded[i + n_active + 1] in (INACTIVE, UNKNOWN)
             ):
                 yield i
-            window.append(after)
 
 
 def possible_states(record: Record) -> int:
@@ -49,7 +48,13 @@ def parse(input: Iterable[str]) -> Iterator[Record]:
     return map(parse_record, map(str.strip, input))
 
 
-def run(input: IO[str], part_2: bool = True) -> int:
+def line_arrangements(line: str) -> int:
+    return possible_states(parse_record(line.strip()))
+
+
+def run(input: IO[str], part_2: bool = True, workers: Optional[int] = None) -> int:
+    if workers is not None:
+        return parallel_sum(line_arrangements, input, workers)
     records = list(parse(input))
     return sum(map(possible_states, records))
 
@@ -68,4 +73,6 @@ def test():
 
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 21
+    assert run(f(_TEST_INPUT), part_2=False, workers=2) == 21
+    assert list(active_placements("?#?.??", 2)) == [0, 1, 4]
     # assert run(f(_TEST_INPUT), part_2=True) == 2
@@ -1,9 +1,9 @@
 from functools import partial
 from itertools import chain, repeat
 from operator import itemgetter, ne
-from typing import IO, Iterable, Iterator, Optional, Sequence, Tuple
+from typing import IO, Iterable, Optional, Sequence, Tuple
 
-from util import Grid, parse_blocks
+from util import Grid, open_buffer, parse_blocks
 
 Reflection = Tuple[bool, int]
 
@@ -40,15 +40,21 @@ def score(reflection: Reflection) -> int:
     return index * 100 if horizontal else index
 
 
-def parse(input: Iterable[str]) -> Iterator[Grid[str]]:
-    return parse_blocks(input, str.splitlines)
+def block_score(tolerance: int, block: str) -> int:
+    return score(find_reflection(tolerance, block.splitlines()))
 
 
-def run(input: IO[str], part_2: bool = True, tolerance: Optional[int] = None) -> int:
-    blocks = parse(input)
+def run(
+    input: IO[str],
+    part_2: bool = True,
+    tolerance: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+) -> int:
     tolerance_ = int(part_2) if tolerance is None else tolerance
-    reflections = map(partial(find_reflection, tolerance_), blocks)
-    return sum(map(score, reflections))
+    score_ = partial(block_score, tolerance_)
+    with open_buffer(input) as buffer:
+        return sum(parse_blocks(buffer, score_, workers=workers, chunksize=chunksize))
 
 
 _TEST_INPUT = """
@@ -75,3 +81,4 @@ def test():
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 405
     assert run(f(_TEST_INPUT), part_2=True) == 400
+    assert run(f(_TEST_INPUT), part_2=True, workers=2, chunksize=1) == 400
@@ -3,9 +3,10 @@ from itertools import accumulate, chain, cycle
 from operator import itemgetter, mul
 from typing import IO, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple
 
-from util import Grid, find_cycle
+from util import Fingerprint, Grid, find_cycle, find_cycle_brent, fingerprint
 
 Direction = Literal["U", "D", "L", "R"]
+GridState = Tuple[Grid[str], Direction]
 
 ROUND_ROCK = "O"
 CUBE_ROCK = "#"
@@ -51,9 +52,15 @@ def tilt_iter(grid: Grid[str], directions: Iterable[Direction]) -> Iterator[Grid
     return accumulate(directions, tilt, initial=grid)
 
 
-def grid_key(grid_state: Tuple[Grid[str], Direction]) -> Tuple[str, Direction]:
+def tilt_state(directions: Sequence[Direction], grid_state: GridState) -> GridState:
     grid, direction = grid_state
-    return "\n".join(map("".join, grid)), direction
+    next_direction = directions[(directions.index(direction) + 1) % len(directions)]
+    return tilt(grid, direction), next_direction
+
+
+def grid_key(grid_state: GridState) -> Tuple[Fingerprint, Direction]:
+    grid, direction = grid_state
+    return fingerprint(map("".join, grid)), direction
 
 
 def load(grid: Grid[str]) -> int:
@@ -66,15 +73,25 @@ def parse(input: Iterable[str]) -> Grid[str]:
     return list(map(str.strip, input))
 
 
-def run(input: IO[str], part_2: bool = True, n: Optional[int] = None) -> int:
+def run(
+    input: IO[str], part_2: bool = True, n: Optional[int] = None, constant_memory: bool = False
+) -> int:
+    """By default every grid up to the first repeat is kept, and keys are fingerprints so that
+    comparing them doesn't touch the grids. With `constant_memory`, only the keys of 2 states
+    are kept, at the cost of recomputing tilts to find the final grid."""
     grid = parse(input)
 
     n_iter = n if n is not None else (4_000_000_000 if part_2 else None)
     if n_iter is not None:
         directions: List[Direction] = ["U", "L", "D", "R"]
-        grids = tilt_iter(grid, cycle(directions))
-        states = zip(grids, cycle(directions))
-        state_cycle = find_cycle(grid_key, states)
+        if constant_memory:
+            state_cycle = find_cycle_brent(
+                grid_key, partial(tilt_state, directions), (grid, directions[0])
+            )
+        else:
+            grids = tilt_iter(grid, cycle(directions))
+            states = zip(grids, cycle(directions))
+            state_cycle = find_cycle(grid_key, states)
         final_grid, _ = state_cycle[n_iter]
         return load(final_grid)
     else:
@@ -113,3 +130,4 @@ def test():
     f = io.StringIO
     assert run(f(_TEST_INPUT), part_2=False) == 136
     assert run(f(_TEST_INPUT), part_2=True) == 64
+    assert run(f(_TEST_INPUT), part_2=True, constant_memory=True) == 64
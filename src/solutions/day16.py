@@ -1,21 +1,26 @@
 from functools import lru_cache, partial
 from itertools import chain, filterfalse, takewhile
 from operator import itemgetter
-from typing import IO, Iterable, List, Literal, Sequence, Set, Tuple, cast
+from typing import IO, Iterable, List, Literal, Set, Tuple, cast
 
-from util import GridCoordinates, index, iterate, translate
+from util import NO_NEIGHBOR, DenseGrid, FlatIndex, iterate, neighbor_table, read_grid
 
-GridContents = Literal[".", "\\", "/", "|", "-"]
-Mirror = Literal["\\", "/"]
-Splitter = Literal["|", "-"]
+# single bytes of the grid, as ints
+GridContents = int
+Mirror = GridContents
+Splitter = GridContents
+# indexes into util.DIRECTIONS: up, left, down, right
 Direction = Literal[0, 1, 2, 3]
-BeamState = Tuple[GridCoordinates, Direction]
+BeamState = Tuple[FlatIndex, Direction]
 
-DIRECTIONS = U, L, D, R = [(-1, 0), (0, -1), (1, 0), (0, 1)]
-EMPTY: GridContents = "."
+EMPTY, BACK_MIRROR, FORWARD_MIRROR, V_SPLITTER, H_SPLITTER = b".\\/|-"
 
 
-class BeamGrid(List[Sequence[GridContents]]):
+class BeamGrid(DenseGrid):
+    def __init__(self, data: bytearray, width: int):
+        super().__init__(data, width)
+        self.neighbor_table = neighbor_table(self.width, self.height)
+
     def __hash__(self):
         return id(self)
 
@@ -26,7 +31,7 @@ def rotate(direction: Direction, by: int) -> Direction:
 
 def reflect(direction: Direction, mirror: Mirror) -> Direction:
     vertical = direction % 2 == 0
-    if mirror == "\\":
+    if mirror == BACK_MIRROR:
         step = 1 if vertical else -1
     else:
         step = -1 if vertical else 1
@@ -35,34 +40,27 @@ def reflect(direction: Direction, mirror: Mirror) -> Direction:
 
 def split(direction: Direction, splitter: Splitter) -> List[Direction]:
     vertical = direction % 2 == 0
-    if (splitter == "|" and vertical) or (splitter == "-" and not vertical):
+    if (splitter == V_SPLITTER and vertical) or (splitter == H_SPLITTER and not vertical):
         return [direction]
     else:
         return [rotate(direction, -1), rotate(direction, 1)]
 
 
-def in_bounds(w: int, h: int, coords: GridCoordinates) -> bool:
-    row, col = coords
-    return (0 <= row < h) and (0 <= col < w)
-
-
 @lru_cache(None)
 def _step(grid: BeamGrid, state: BeamState) -> List[BeamState]:
-    coords, direction = state
-    contents = index(grid, coords)
+    ix, direction = state
+    contents = grid.data[ix]
     if contents == EMPTY:
         new_directions = [direction]
-    elif contents == "\\" or contents == "/":
+    elif contents == BACK_MIRROR or contents == FORWARD_MIRROR:
         new_directions = [reflect(direction, contents)]
-    elif contents == "-" or contents == "|":
+    elif contents == H_SPLITTER or contents == V_SPLITTER:
         new_directions = split(direction, contents)
     else:
-        raise ValueError(contents)
+        raise ValueError(chr(contents))
 
-    height = len(grid)
-    width = len(grid[0])
-    new_coords = (translate(coords, DIRECTIONS[d]) for d in new_directions)
-    return [(c, d) for c, d in zip(new_coords, new_directions) if in_bounds(width, height, c)]
+    neighbors = grid.neighbor_table
+    return [(nbr, d) for d in new_directions if (nbr := neighbors[d][ix]) != NO_NEIGHBOR]
 
 
 def step(grid: BeamGrid, prior_states: Set[BeamState], states: List[BeamState]) -> List[BeamState]:
@@ -85,25 +83,25 @@ def num_energized(grid: BeamGrid, initial: BeamState) -> int:
     return len(set(map(itemgetter(0), all_states)))
 
 
-def parse(input: Iterable[str]) -> BeamGrid:
-    return BeamGrid(map(partial(cast, GridContents), map(str.strip, input)))
+def parse(input: IO[str]) -> BeamGrid:
+    grid = read_grid(input)
+    return BeamGrid(grid.data, grid.width)
 
 
 def run(input: IO[str], part_2: bool = True) -> int:
     grid = parse(input)
-    height = len(grid)
-    width = len(grid[0])
+    height, width = grid.shape
 
     initial_states: Iterable[BeamState]
     if part_2:
         initial_states = chain(
-            (((height - 1, i), 0) for i in range(width)),
-            (((i, width - 1), 1) for i in range(height)),
-            (((0, i), 2) for i in range(width)),
-            (((i, 0), 3) for i in range(height)),
+            (((height - 1) * width + i, 0) for i in range(width)),
+            ((i * width + width - 1, 1) for i in range(height)),
+            ((i, 2) for i in range(width)),
+            ((i * width, 3) for i in range(height)),
         )
     else:
-        initial_states = [((0, 0), 3)]
+        initial_states = [(0, 3)]
 
     return max(map(partial(num_energized, grid), initial_states))
 
@@ -1,12 +1,30 @@
+import os
+import pickle
+import re
 import sys
+from abc import ABC, abstractmethod
+from array import array
 from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import partial, reduce
-from heapq import heappop, heappush
-from itertools import accumulate, chain, cycle, filterfalse, islice, product, repeat
-from operator import add, and_, is_, is_not, itemgetter, not_, sub
+from hashlib import blake2b
+from heapq import heappop, heappush, nsmallest
+from io import UnsupportedOperation
+from itertools import accumulate, chain, count, cycle, filterfalse, islice, product, repeat
+from math import gcd, inf, lcm
+from mmap import ACCESS_READ, mmap
+from multiprocessing import Value
+from multiprocessing.sharedctypes import Synchronized
+from operator import add, and_, attrgetter, gt, is_, is_not, itemgetter, lt, not_, sub
+from pathlib import Path
+from stat import S_ISREG
+from tempfile import TemporaryDirectory
 from typing import (
+    IO,
     AbstractSet,
+    Any,
     Callable,
     Collection,
     Deque,
@@ -16,10 +34,12 @@ from typing import (
     Iterable,
     Iterator,
     List,
+    Literal,
     Mapping,
     MutableMapping,
     NamedTuple,
     Optional,
+    Protocol,
     Sequence,
     Set,
     Tuple,
@@ -40,6 +60,17 @@ U = TypeVar("U")
 V = TypeVar("V")
 
 
+class Comparable(Protocol):
+    def __lt__(self, other: Any) -> bool:
+        ...
+
+    def __gt__(self, other: Any) -> bool:
+        ...
+
+
+C = TypeVar("C", bound=Comparable)
+
+
 # Math
 
 
@@ -47,17 +78,45 @@ def sign(x: int) -> int:
     return 0 if x == 0 else (1 if x > 0 else -1)
 
 
-def gcd(m, n):
-    # Euclid
-    larger, smaller = (m, n) if m > n else (n, m)
-    if smaller == 0:
-        return larger
-    _, rem = divmod(larger, smaller)
-    return gcd(smaller, rem)
+def gcd_all(values: Iterable[int]) -> int:
+    return gcd(*values)
+
+
+def lcm_all(values: Iterable[int]) -> int:
+    return lcm(*values)
+
 
+class Congruence(NamedTuple):
+    """The integers x with x = residue (mod modulus)"""
 
-def lcm(a: int, b: int) -> int:
-    return a * b // gcd(a, b)
+    residue: int
+    modulus: int
+
+    def first_at_least(self, lower: int) -> int:
+        return self.residue + -((self.residue - lower) // self.modulus) * self.modulus
+
+
+def combine_congruences(a: Congruence, b: Congruence) -> Optional[Congruence]:
+    """Chinese remainder theorem for moduli that need not be coprime; None if a and b have no
+    common solution"""
+    (r1, m1), (r2, m2) = a, b
+    g = gcd(m1, m2)
+    diff = r2 - r1
+    if diff % g:
+        return None
+    m2_ = m2 // g
+    k = (diff // g) * pow(m1 // g, -1, m2_) % m2_
+    modulus = m1 * m2_
+    return Congruence((r1 + m1 * k) % modulus, modulus)
+
+
+def solve_congruences(congruences: Iterable[Congruence]) -> Optional[Congruence]:
+    solution: Optional[Congruence] = Congruence(0, 1)
+    for c in congruences:
+        solution = combine_congruences(solution, c)  # type: ignore
+        if solution is None:
+            break
+    return solution
 
 
 class Inf(int):
@@ -85,6 +144,8 @@ class Inf(int):
         return "+inf"
 
 
+# Inf compares in Python code; graph algorithms use the float inf internally, which compares in C,
+# and only return INF
 INF = Inf()
 
 
@@ -184,6 +245,80 @@ def window(size: int, it: Iterable[T]) -> Iterator[Deque[T]]:
             yield win
 
 
+IndexRange = Tuple[int, int]
+
+
+def _view(seq: Sequence[T]) -> Sequence[T]:
+    # slices of a memoryview share the underlying buffer rather than copying it
+    buffer = isinstance(seq, (bytes, bytearray, array, mmap))
+    return memoryview(seq) if buffer else seq  # type: ignore
+
+
+def window_bounds(size: int, length: int) -> Iterator[IndexRange]:
+    """(start, stop) indices of each window of `size` in a sequence of `length`"""
+    return zip(range(0, length - size + 1), range(size, length + 1))
+
+
+def chunk_bounds(n: int, length: int) -> Iterator[IndexRange]:
+    """(start, stop) indices of each chunk of `n` in a sequence of `length`"""
+    return zip(range(0, length, n), chain(range(n, length, n), (length,) if length else ()))
+
+
+def window_slices(size: int, seq: Sequence[T]) -> Iterator[Sequence[T]]:
+    """As `window`, but yielding an independent slice per window, which is a zero-copy
+    `memoryview` when `seq` is a buffer"""
+    view = _view(seq)
+    return (view[start:stop] for start, stop in window_bounds(size, len(seq)))
+
+
+def chunked_slices(n: int, seq: Sequence[T]) -> Iterator[Sequence[T]]:
+    """As `chunked`, but yielding slices, which are zero-copy `memoryview`s when `seq` is a
+    buffer"""
+    view = _view(seq)
+    return (view[start:stop] for start, stop in chunk_bounds(n, len(seq)))
+
+
+def sliding_sum(size: int, values: Iterable[int]) -> List[int]:
+    """Sum of each window of `size` over `values`, by differences of prefix sums"""
+    sums = list(accumulate(values, initial=0))
+    return list(map(sub, sums[size:], sums[: len(sums) - size]))
+
+
+def sliding_all(size: int, values: Iterable) -> List[bool]:
+    return list(map(size.__eq__, sliding_sum(size, map(bool, values))))
+
+
+def sliding_any(size: int, values: Iterable) -> List[bool]:
+    return list(map(bool, sliding_sum(size, map(bool, values))))
+
+
+def _sliding_extremum(size: int, values: Iterable[C], better: Callable[[C, C], bool]) -> List[C]:
+    # indices of a monotonic sequence of candidate extrema for the current window
+    candidates: Deque[int] = deque()
+    values_: List[C] = []
+    result: List[C] = []
+    for i, value in enumerate(values):
+        values_.append(value)
+        while candidates and not better(values_[candidates[-1]], value):
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - size:
+            candidates.popleft()
+        if i >= size - 1:
+            result.append(values_[candidates[0]])
+    return result
+
+
+def sliding_min(size: int, values: Iterable[C]) -> List[C]:
+    """Minimum of each window of `size` over `values`, in linear time"""
+    return _sliding_extremum(size, values, lt)
+
+
+def sliding_max(size: int, values: Iterable[C]) -> List[C]:
+    """Maximum of each window of `size` over `values`, in linear time"""
+    return _sliding_extremum(size, values, gt)
+
+
 @dataclass
 class StateCycle(Sequence[T]):
     prefix: Sequence[T]
@@ -210,7 +345,13 @@ class StateCycle(Sequence[T]):
             raise NotImplementedError(f"Can't slice {type(self)}")
 
 
-def find_cycle(key: Callable[[T], H], states: Iterable[T]) -> StateCycle[T]:
+def find_cycle(
+    key: Callable[[T], H],
+    states: Iterable[T],
+    verify: Optional[Callable[[T, T], bool]] = None,
+) -> StateCycle[T]:
+    """Find the first repeated state by `key`. If keys are lossy, e.g. fingerprints, `verify` may
+    be passed to check that states with equal keys are in fact equal"""
     seen_states: Dict[H, int] = {}
     state_cycle: List[T] = []
     for i, s in enumerate(states):
@@ -220,11 +361,64 @@ def find_cycle(key: Callable[[T], H], states: Iterable[T]) -> StateCycle[T]:
             seen_states[k] = i
             state_cycle.append(s)
         else:
+            if verify is not None and not verify(state_cycle[last_seen], s):
+                raise ValueError(f"Key collision between states {last_seen} and {i}: {k!r}")
             return StateCycle(state_cycle[:last_seen], state_cycle[last_seen:])
     else:
         raise ValueError("No cycle found")
 
 
+class IteratedStates(Sequence[T]):
+    """The first `length` values of `iterate(f, initial)`, recomputed on access, not stored"""
+
+    def __init__(self, f: Callable[[T], T], initial: T, length: int):
+        self.f = f
+        self.initial = initial
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return islice(iterate(self.f, self.initial), self.length)
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            ix = item + self.length if item < 0 else item
+            if not 0 <= ix < self.length:
+                raise IndexError(item)
+            return next(islice(iterate(self.f, self.initial), ix, None))
+        else:
+            raise NotImplementedError(f"Can't slice {type(self)}")
+
+
+def find_cycle_brent(key: Callable[[T], H], f: Callable[[T], T], initial: T) -> StateCycle[T]:
+    """Constant-memory alternative to `find_cycle` for the states `iterate(f, initial)`, using
+    Brent's algorithm. Only keys of 2 states are held at a time; states of the result are
+    recomputed from `f` when it is indexed."""
+    power = cycle_len = 1
+    tortoise_key = key(initial)
+    hare = f(initial)
+    hare_key = key(hare)
+    while tortoise_key != hare_key:
+        if power == cycle_len:
+            tortoise_key = hare_key
+            power *= 2
+            cycle_len = 0
+        hare = f(hare)
+        hare_key = key(hare)
+        cycle_len += 1
+
+    tortoise = initial
+    hare = next(islice(iterate(f, initial), cycle_len, None))
+    offset = 0
+    while key(tortoise) != key(hare):
+        tortoise, hare = f(tortoise), f(hare)
+        offset += 1
+
+    return StateCycle(IteratedStates(f, initial, offset), IteratedStates(f, tortoise, cycle_len))
+
+
 @tail_recursive
 def reduce_while(
     condition: Callable[[T, T], bool],
@@ -250,6 +444,23 @@ def reduce_while(
             yield from reduce_while(condition, agg, it, accumulator)
 
 
+# Hashing
+
+Fingerprint = bytes
+FINGERPRINT_SIZE = 16
+Chunk = Union[str, bytes, bytearray, memoryview]
+
+
+def fingerprint(chunks: Iterable[Chunk]) -> Fingerprint:
+    """128-bit digest of a sequence of strings or buffers, e.g. the rows of a grid, computed
+    incrementally, without joining them"""
+    digest = blake2b(digest_size=FINGERPRINT_SIZE)
+    for chunk in chunks:
+        digest.update(chunk.encode() if isinstance(chunk, str) else chunk)
+        digest.update(b"\n")
+    return digest.digest()
+
+
 # Miscellaneous
 
 
@@ -337,6 +548,206 @@ def adjacent_coords(
         yield from ((i + 1, k) for k in range(min_x, max_x + 1))
 
 
+FlatIndex = int
+
+
+class DenseGrid:
+    """Rectangular grid of single-byte cells, stored row-major in a flat `bytearray`.
+    Rows and columns are available as zero-copy (strided) `memoryview`s, and cells may be
+    addressed either by (row, column) coordinates or by flat index."""
+
+    def __init__(self, data: bytearray, width: int):
+        if width <= 0 or len(data) % width:
+            raise ValueError(f"Grid data of length {len(data)} is not divisible by width {width}")
+        self.data = data
+        self.width = width
+        self.height = len(data) // width
+        self.view = memoryview(data)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "DenseGrid":
+        raw = raw.replace(b"\r", b"").strip(b"\n")
+        rows = raw.split(b"\n")
+        width = len(rows[0])
+        if any(len(row) != width for row in rows):
+            raise ValueError(f"Grid rows are not all of length {width}")
+        return cls(bytearray().join(rows), width)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Union[str, bytes]]) -> "DenseGrid":
+        rows = [line.encode() if isinstance(line, str) else line for line in lines]
+        return cls.from_bytes(b"\n".join(rows))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def __len__(self):
+        return self.height
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, DenseGrid) and self.width == other.width and self.data == other.data
+        )
+
+    def __str__(self):
+        return "\n".join(row.tobytes().decode() for row in self.rows())
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            i, j = item
+            if not (-self.height <= i < self.height and -self.width <= j < self.width):
+                raise IndexError(item)
+            return self.data[(i % self.height) * self.width + j % self.width]
+        return self.row(item)
+
+    def copy(self) -> "DenseGrid":
+        return DenseGrid(bytearray(self.data), self.width)
+
+    def flat_index(self, coords: GridCoordinates) -> FlatIndex:
+        i, j = coords
+        return i * self.width + j
+
+    def coords(self, ix: FlatIndex) -> GridCoordinates:
+        return divmod(ix, self.width)
+
+    def row(self, i: int) -> memoryview:
+        if not -self.height <= i < self.height:
+            raise IndexError(i)
+        start = (i % self.height) * self.width
+        return self.view[start : start + self.width]  # noqa: E203
+
+    def column(self, j: int) -> memoryview:
+        if not -self.width <= j < self.width:
+            raise IndexError(j)
+        return self.view[j % self.width :: self.width]  # noqa: E203
+
+    def rows(self) -> Iterator[memoryview]:
+        return map(self.row, range(self.height))
+
+    def columns(self) -> Iterator[memoryview]:
+        return map(self.column, range(self.width))
+
+    def transpose(self) -> "DenseGrid":
+        width, height = self.width, self.height
+        data = bytearray(len(self.data))
+        for j in range(width):
+            data[j * height : (j + 1) * height] = self.data[j::width]  # noqa: E203
+        return DenseGrid(data, height)
+
+    def indices(self, value: bytes) -> Iterator[FlatIndex]:
+        """Flat indices of all cells equal to the single byte `value`"""
+        find = self.data.find
+        ix = find(value)
+        while ix >= 0:
+            yield ix
+            ix = find(value, ix + 1)
+
+    def neighbors(self, ix: FlatIndex, diagonal: bool = False) -> Iterator[FlatIndex]:
+        """Flat indices of the in-bounds orthogonal (and optionally diagonal) neighbors of the
+        cell at flat index `ix`"""
+        width = self.width
+        i, j = divmod(ix, width)
+        up, down, left, right = i > 0, i < self.height - 1, j > 0, j < width - 1
+        if up:
+            if diagonal and left:
+                yield ix - width - 1
+            yield ix - width
+            if diagonal and right:
+                yield ix - width + 1
+        if left:
+            yield ix - 1
+        if right:
+            yield ix + 1
+        if down:
+            if diagonal and left:
+                yield ix + width - 1
+            yield ix + width
+            if diagonal and right:
+                yield ix + width + 1
+
+
+# orthogonal directions, in counter-clockwise order; rotating by k is adding k mod 4
+UP: Vector = (-1, 0)
+LEFT: Vector = (0, -1)
+DOWN: Vector = (1, 0)
+RIGHT: Vector = (0, 1)
+DIRECTIONS: Sequence[Vector] = (UP, LEFT, DOWN, RIGHT)
+NO_NEIGHBOR = -1
+
+
+def direction_offsets(width: int) -> Tuple[int, int, int, int]:
+    """Flat index offsets for each of the `DIRECTIONS` in a grid of width `width`"""
+    return -width, -1, width, 1
+
+
+def neighbor_table(width: int, height: int) -> Tuple[array, array, array, array]:
+    """For each of the `DIRECTIONS`, an array mapping each flat index of a grid to the flat index
+    of its neighbor in that direction, or `NO_NEIGHBOR` where that would be out of bounds"""
+    n = width * height
+    up = array("i", range(-width, n - width))
+    left = array("i", range(-1, n - 1))
+    down = array("i", range(width, n + width))
+    right = array("i", range(1, n + 1))
+    up[:width] = down[n - width :] = array("i", [NO_NEIGHBOR]) * width  # noqa: E203
+    left[::width] = right[width - 1 :: width] = array("i", [NO_NEIGHBOR]) * height  # noqa: E203
+    return up, left, down, right
+
+
+# Bulk neighborhood queries
+
+# cells of a row-major grid as the bits of an int, with bit i corresponding to flat index i;
+# shifts and logical ops then act on all cells at once
+Bitmask = int
+# (start coordinates, length) of a horizontal run of cells
+Span = Tuple[GridCoordinates, int]
+
+_TO_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def bitmask(data: Union[bytes, bytearray], members: bytes) -> Bitmask:
+    """Bitmask of the cells of `data` equal to any of the bytes in `members`"""
+    table = bytes(0x31 if b in members else 0x30 for b in range(256))  # b"1" / b"0"
+    bits = bytes(data).translate(table)
+    return int(bits[::-1], 2) if bits else 0
+
+
+def unpack_bitmask(mask: Bitmask, size: int) -> bytes:
+    """One byte per cell, 1 where `mask` is set, 0 elsewhere, for fast slicing"""
+    return format(mask, f"0{size}b")[::-1].encode().translate(_TO_BITS)[:size]
+
+
+def column_mask(width: int, height: int, col: int) -> Bitmask:
+    pattern = ["0"] * width
+    pattern[width - 1 - col] = "1"
+    return int("".join(pattern) * height, 2)
+
+
+def dilate(mask: Bitmask, width: int, height: int) -> Bitmask:
+    """3x3 dilation of `mask` on a grid of the given shape: the cells which are set or have a set
+    neighbor, including diagonally"""
+    first_col, last_col = column_mask(width, height, 0), column_mask(width, height, width - 1)
+    horizontal = mask | ((mask << 1) & ~first_col) | ((mask >> 1) & ~last_col)
+    full = (1 << (width * height)) - 1
+    return (horizontal | (horizontal << width) | (horizontal >> width)) & full
+
+
+def spans_adjacent_to(mask: Bitmask, width: int, height: int, spans: Iterable[Span]) -> List[bool]:
+    """For each span, whether any cell set in `mask` is in or adjacent to it, via one dilation of
+    `mask` rather than a neighborhood scan per span"""
+    cells = unpack_bitmask(dilate(mask, width, height), width * height)
+    return [
+        1 in cells[i * width + j : i * width + j + len_] for (i, j), len_ in spans  # noqa: E203
+    ]
+
+
+def read_grid(input_: IO) -> DenseGrid:
+    """Read a grid from a text or binary file, bypassing text decoding where possible"""
+    buffer = getattr(input_, "buffer", None)
+    raw = input_.read() if buffer is None else buffer.read()
+    return DenseGrid.from_bytes(raw.encode() if isinstance(raw, str) else raw)
+
+
 @dataclass
 class SparseGrid(Generic[T]):
     grid: Dict[GridCoordinates, T]
@@ -369,7 +780,15 @@ class SparseGrid(Generic[T]):
         return self
 
     def set_all(self, value: T, coords: Iterable[GridCoordinates]) -> "SparseGrid[T]":
-        return reduce(lambda grid, coord: grid.set(value, coord), coords, self)
+        coords_ = list(coords)
+        if coords_:
+            xs, ys = zip(*coords_)
+            self.x_min = _min(self.x_min, min(xs))
+            self.x_max = _max(self.x_max, max(xs))
+            self.y_min = _min(self.y_min, min(ys))
+            self.y_max = _max(self.y_max, max(ys))
+            self.grid.update(dict.fromkeys(coords_, value))
+        return self
 
 
 def _min(old: Optional[int], new: int) -> int:
@@ -380,6 +799,153 @@ def _max(old: Optional[int], new: int) -> int:
     return new if old is None else max(old, new)
 
 
+BoundingBox = Tuple[int, int, int, int]
+
+
+class TiledGrid:
+    """Sparse grid of small integers, stored in dense square `array` tiles of side `tile_size`
+    which are allocated on first write. Values are limited to the range of `typecode`, and the
+    value `missing` marks unset cells, so it can't be set. `SparseGrid`'s methods and bounds are
+    supported, but there is no `grid` mapping."""
+
+    def __init__(self, tile_size: int = 64, typecode: str = "b", missing: int = -1):
+        self.tile_size = tile_size
+        self.typecode = typecode
+        self.missing = missing
+        self.tiles: Dict[GridCoordinates, array] = {}
+        self.x_min: Optional[int] = None
+        self.x_max: Optional[int] = None
+        self.y_min: Optional[int] = None
+        self.y_max: Optional[int] = None
+        self._empty_tile = array(typecode, [missing]) * (tile_size * tile_size)
+
+    def __contains__(self, coords: GridCoordinates):
+        return self.get(coords) is not None
+
+    def __len__(self):
+        missing = self.missing
+        return sum(len(tile) - tile.count(missing) for tile in self.tiles.values())
+
+    @property
+    def n_rows(self) -> int:
+        return 0 if self.y_min is None or self.y_max is None else (self.y_max + 1 - self.y_min)
+
+    @property
+    def n_cols(self) -> int:
+        return 0 if self.x_min is None or self.x_max is None else (self.x_max + 1 - self.x_min)
+
+    def bounding_box(self) -> Optional[BoundingBox]:
+        """(x_min, x_max, y_min, y_max), inclusive, or None if the grid is empty"""
+        if self.x_min is None or self.x_max is None or self.y_min is None or self.y_max is None:
+            return None
+        return self.x_min, self.x_max, self.y_min, self.y_max
+
+    def _tile(self, tile_coords: GridCoordinates) -> array:
+        tile = self.tiles.get(tile_coords)
+        if tile is None:
+            self.tiles[tile_coords] = tile = array(self.typecode, self._empty_tile)
+        return tile
+
+    def _check_value(self, value: int):
+        if value == self.missing:
+            raise ValueError(f"Can't set cells to {value}, which marks missing cells")
+
+    def _update_bounds(self, x_min: int, x_max: int, y_min: int, y_max: int):
+        if self.x_min is None or x_min < self.x_min:
+            self.x_min = x_min
+        if self.x_max is None or x_max > self.x_max:
+            self.x_max = x_max
+        if self.y_min is None or y_min < self.y_min:
+            self.y_min = y_min
+        if self.y_max is None or y_max > self.y_max:
+            self.y_max = y_max
+
+    def get(self, coord: GridCoordinates) -> Optional[int]:
+        x, y = coord
+        size = self.tile_size
+        tile = self.tiles.get((x // size, y // size))
+        if tile is None:
+            return None
+        value = tile[(x % size) * size + y % size]
+        return None if value == self.missing else value
+
+    def set(self, value: int, coord: GridCoordinates) -> "TiledGrid":
+        self._check_value(value)
+        x, y = coord
+        size = self.tile_size
+        self._tile((x // size, y // size))[(x % size) * size + y % size] = value
+        self._update_bounds(x, x, y, y)
+        return self
+
+    def set_all(self, value: int, coords: Iterable[GridCoordinates]) -> "TiledGrid":
+        self._check_value(value)
+        size = self.tile_size
+        tile_coords, tile = None, self._empty_tile
+        coords_ = iter(coords)
+        first_ = next(coords_, None)
+        if first_ is None:
+            return self
+        x_min, y_min = x_max, y_max = first_
+        for x, y in chain((first_,), coords_):
+            # consecutive coordinates usually share a tile; skip the lookup in that case
+            if (x // size, y // size) != tile_coords:
+                tile_coords = (x // size, y // size)
+                tile = self._tile(tile_coords)
+            tile[(x % size) * size + y % size] = value
+            if x < x_min:
+                x_min = x
+            elif x > x_max:
+                x_max = x
+            if y < y_min:
+                y_min = y
+            elif y > y_max:
+                y_max = y
+        self._update_bounds(x_min, x_max, y_min, y_max)
+        return self
+
+    def set_region(self, value: int, box: BoundingBox) -> "TiledGrid":
+        """Set all cells in the inclusive box (x_min, x_max, y_min, y_max) with slice assignment,
+        one tile row at a time"""
+        self._check_value(value)
+        x_min, x_max, y_min, y_max = box
+        if x_min > x_max or y_min > y_max:
+            return self
+        size = self.tile_size
+        for tx, ty in product(
+            range(x_min // size, x_max // size + 1), range(y_min // size, y_max // size + 1)
+        ):
+            tile = self._tile((tx, ty))
+            i0, i1 = max(x_min - tx * size, 0), min(x_max - tx * size, size - 1)
+            j0, j1 = max(y_min - ty * size, 0), min(y_max - ty * size, size - 1)
+            fill = array(self.typecode, [value]) * (j1 + 1 - j0)
+            for i in range(i0, i1 + 1):
+                tile[i * size + j0 : i * size + j1 + 1] = fill  # noqa: E203
+        self._update_bounds(x_min, x_max, y_min, y_max)
+        return self
+
+    def region(self, box: Optional[BoundingBox] = None) -> Iterator[Tuple[GridCoordinates, int]]:
+        """All set cells and their values in the inclusive box (x_min, x_max, y_min, y_max), or in
+        the whole grid if no box is given, in tile order"""
+        bbox = self.bounding_box() if box is None else box
+        if bbox is None:
+            return
+        x_min, x_max, y_min, y_max = bbox
+        size, missing = self.tile_size, self.missing
+        for (tx, ty), tile in self.tiles.items():
+            x0, y0 = tx * size, ty * size
+            if x0 > x_max or x0 + size <= x_min or y0 > y_max or y0 + size <= y_min:
+                continue
+            i0, i1 = max(x_min - x0, 0), min(x_max - x0, size - 1)
+            j0, j1 = max(y_min - y0, 0), min(y_max - y0, size - 1)
+            for i in range(i0, i1 + 1):
+                row = tile[i * size + j0 : i * size + j1 + 1]  # noqa: E203
+                if row.count(missing) < len(row):
+                    x = x0 + i
+                    for j, value in enumerate(row, y0 + j0):
+                        if value != missing:
+                            yield (x, j), value
+
+
 class HeapItem(NamedTuple, Generic[K, T]):
     key: K
     value: T
@@ -397,6 +963,134 @@ class HeapItem(NamedTuple, Generic[K, T]):
         return self.value >= other.value
 
 
+class FenwickTree2D:
+    """Sums over `[0, rows) x [0, cols)` of a grid of ints under point updates, both in
+    O(log(n_rows) * log(n_cols))"""
+
+    def __init__(self, n_rows: int, n_cols: int):
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.tree = array("q", bytes(8 * (n_rows + 1) * (n_cols + 1)))
+
+    def add(self, row: int, col: int, value: int):
+        tree, width = self.tree, self.n_cols + 1
+        i = row + 1
+        while i <= self.n_rows:
+            j = col + 1
+            while j <= self.n_cols:
+                tree[i * width + j] += value
+                j += j & -j
+            i += i & -i
+
+    def prefix_sum(self, rows: int, cols: int) -> int:
+        tree, width = self.tree, self.n_cols + 1
+        total = 0
+        i = min(rows, self.n_rows)
+        while i > 0:
+            j = min(cols, self.n_cols)
+            while j > 0:
+                total += tree[i * width + j]
+                j -= j & -j
+            i -= i & -i
+        return total
+
+
+class Trie:
+    """Compact trie of strings. Nodes are numbered breadth-first with the root as 0, so the
+    children of node i are the contiguous nodes `offsets[i]` to `offsets[i + 1] - 1`, in sorted
+    order of `labels`, the character leading to each node. Methods returning nodes return -1 for
+    no node, like `str.find`."""
+
+    def __init__(self, strings: Iterable[str]):
+        nested: Dict[Optional[str], dict] = {}
+        for string in strings:
+            node = nested
+            for c in string:
+                node = node.setdefault(c, {})
+            node[None] = {}
+        labels = ["\0"]
+        offsets = array("i")
+        terminal = bytearray()
+        queue = deque([nested])
+        while queue:
+            node = queue.popleft()
+            offsets.append(len(labels))
+            terminal.append(None in node)
+            for c in sorted(filter(None, node)):
+                labels.append(c)
+                queue.append(node[c])
+        offsets.append(len(labels))
+        self.labels = "".join(labels)
+        self.offsets = offsets
+        self.terminal = terminal
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.labels)
+
+    def __len__(self):
+        return sum(self.terminal)
+
+    def __contains__(self, item: str):
+        node = self.find(item)
+        return node != -1 and bool(self.terminal[node])
+
+    def __iter__(self) -> Iterator[str]:
+        return self.with_prefix("")
+
+    def child(self, node: int, c: str) -> int:
+        return self.labels.find(c, self.offsets[node], self.offsets[node + 1])
+
+    def children(self, node: int) -> Iterator[Tuple[str, int]]:
+        start, stop = self.offsets[node], self.offsets[node + 1]
+        return zip(self.labels[start:stop], range(start, stop))
+
+    def is_leaf(self, node: int) -> bool:
+        return self.offsets[node] == self.offsets[node + 1]
+
+    def walk(self, text: str, start: int = 0) -> Iterator[int]:
+        """Nodes reached by consuming `text[start:]` one character at a time, while possible"""
+        node = 0
+        for c in islice(text, start, None):
+            node = self.child(node, c)
+            if node == -1:
+                break
+            yield node
+
+    def find(self, prefix: str) -> int:
+        node = 0
+        for c in prefix:
+            node = self.child(node, c)
+            if node == -1:
+                break
+        return node
+
+    def prefixes_of(self, text: str, start: int = 0) -> Iterator[int]:
+        """Stop indices of all strings of the trie which `text[start:]` starts with"""
+        terminal = self.terminal
+        return (i for i, node in enumerate(self.walk(text, start), start + 1) if terminal[node])
+
+    def longest_match(self, text: str, start: int = 0) -> Optional[int]:
+        """Stop index of the longest string of the trie which `text[start:]` starts with"""
+        return max(self.prefixes_of(text, start), default=None)
+
+    def all_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(start, stop) indices of all occurrences of strings of the trie in `text`"""
+        return ((i, j) for i in range(len(text)) for j in self.prefixes_of(text, i))
+
+    def with_prefix(self, prefix: str) -> Iterator[str]:
+        """All strings of the trie starting with `prefix`, in sorted order"""
+        node = self.find(prefix)
+        if node == -1:
+            return
+        stack = [(prefix, node)]
+        while stack:
+            string, node = stack.pop()
+            if self.terminal[node]:
+                yield string
+            stack.extend((string + c, child) for c, child in reversed(list(self.children(node))))
+
+
 @dataclass
 class Tree(Generic[K, T]):
     id: K
@@ -414,12 +1108,36 @@ class Tree(Generic[K, T]):
 TreePath = Tuple[K, ...]
 
 
+class PathLink(NamedTuple, Generic[K]):
+    """A tree path as a linked list from its last key; paths to siblings share their prefix"""
+
+    key: K
+    parent: Optional["PathLink[K]"]
+
+    def path(self) -> TreePath[K]:
+        keys = [link.key for link in nonnull_head(iterate(attrgetter("parent"), self))]
+        return tuple(reversed(keys))
+
+
+def dfs_links(tree: Tree[K, T]) -> Iterator[Tuple[PathLink[K], Tree[K, T]]]:
+    """Pre-order traversal using O(1) space per node for paths; safe for trees of any depth"""
+    stack: List[Tuple[PathLink[K], Tree[K, T]]] = [(PathLink(tree.id, None), tree)]
+    while stack:
+        link, node = stack.pop()
+        yield link, node
+        if isinstance(node, Tree):
+            stack.extend(
+                (PathLink(key, link), child) for key, child in reversed(node.children.items())
+            )
+
+
 def dfs(tree: Tree[K, T], path: TreePath[K] = ()) -> Iterator[Tuple[TreePath[K], Tree[K, T]]]:
-    path = path or (tree.id,)
-    yield path, tree
-    if isinstance(tree, Tree):
-        for key, sub_tree in tree.children.items():
-            yield from dfs(sub_tree, (*path, key))
+    stack: List[Tuple[TreePath[K], Tree[K, T]]] = [(path or (tree.id,), tree)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node
+        if isinstance(node, Tree):
+            stack.extend(((*path, key), child) for key, child in reversed(node.children.items()))
 
 
 def tree_acc(
@@ -427,9 +1145,19 @@ def tree_acc(
     f: Callable[[T], U],
     acc: Callable[[U, U], U],
 ) -> Tree[K, U]:
-    children = {k: tree_acc(t, f, acc) for k, t in tree.children.items()}
-    data = reduce(acc, (t.data for t in children.values()), f(tree.data))
-    return Tree(tree.id, data, children)
+    root: Tree[K, U] = Tree(tree.id, f(tree.data), {})
+    stack = [(tree, root)]
+    pre_order = []
+    while stack:
+        node, new_node = stack.pop()
+        pre_order.append(new_node)
+        for key, child in node.children.items():
+            new_child = new_node.children[key] = Tree(child.id, f(child.data), {})
+            stack.append((child, new_child))
+    # children follow their parents in pre-order, so are accumulated before them in reverse
+    for new_node in reversed(pre_order):
+        new_node.data = reduce(acc, (t.data for t in new_node.children.values()), new_node.data)
+    return root
 
 
 # node -> node -> weight
@@ -601,16 +1329,17 @@ class DjikstraState(Generic[K]):
         self.start = start
         self.visited_ends: Set[K] = set()
         self.visited: Set[K] = set()
-        self.distances: Dict[K, int] = defaultdict(Inf)
+        self.distances: Dict[K, float] = {}
         self.min_dist_heap: List[HeapItem[K, int]] = []
         self.predecessors: Dict[K, K] = {}
         self.distances[start] = 0
         self.accumulate_shortest_paths()
 
     def update_dists(self, node_dists: Iterable[Tuple[K, int]], node: K):
+        distances = self.distances
         for n, dist in node_dists:
-            if dist < self.distances[n]:
-                self.distances[n] = dist
+            if dist < distances.get(n, inf):
+                distances[n] = dist
                 self.predecessors[n] = node
                 dist_estimated = dist if self.heuristic is None else dist + self.heuristic(n)
                 heappush(self.min_dist_heap, HeapItem(n, dist_estimated))
@@ -624,7 +1353,7 @@ class DjikstraState(Generic[K]):
         return heappop(self.min_dist_heap).key if self.min_dist_heap else None
 
     def distance(self, node: K) -> int:
-        return self.distances[node]
+        return self.distances.get(node, INF)  # type: ignore
 
     def shortest_path(self, end: K) -> Tuple[List[K], int]:
         if end not in self.distances:
@@ -646,13 +1375,13 @@ class DjikstraState(Generic[K]):
 
 def floyd_warshall(graph: WeightedDiGraph[K]) -> WeightedDiGraph[K]:
     def dist(distances: WeightedDiGraph[K], node1: K, node2: K):
-        return 0 if node1 == node2 else distances.get(node1, {}).get(node2, INF)
+        return 0 if node1 == node2 else distances.get(node1, {}).get(node2, inf)
 
     def update_dist(distances: WeightedDiGraph[K], nodes: Tuple[K, K, K]) -> WeightedDiGraph[K]:
         node1, node2, node3 = nodes
         candidate_dist = dist(distances, node2, node1) + dist(distances, node1, node3)
         current_dist = dist(distances, node2, node3)
-        if node2 != node3 and candidate_dist < current_dist and candidate_dist < INF:
+        if node2 != node3 and candidate_dist < current_dist:
             if node2 in distances:
                 neighbors = distances[node2]
             else:
@@ -668,67 +1397,392 @@ def floyd_warshall(graph: WeightedDiGraph[K]) -> WeightedDiGraph[K]:
 
 # Hard problems
 
+SearchStrategy = Literal["breadth", "depth", "best", "beam"]
+OverflowPolicy = Literal["depth", "spill"]
+BoundedCandidate = Tuple[int, T]
 
-def branch_and_bound(
-    initial: Iterable[T],
-    heuristic_solution: T,
+# best objective found so far, shared between the main process and branch-and-bound workers
+_INCUMBENT: Optional[Synchronized] = None
+
+
+@dataclass
+class SearchStats:
+    expanded: int = 0
+    generated: int = 0
+    pruned: int = 0
+    discarded: int = 0
+    spilled: int = 0
+    solutions: int = 0
+    improvements: int = 0
+    max_frontier: int = 0
+    best_objective: Optional[int] = None
+
+    def __str__(self):
+        return (
+            f"best={self.best_objective} expanded={self.expanded} generated={self.generated} "
+            f"pruned={self.pruned} discarded={self.discarded} spilled={self.spilled} "
+            f"solutions={self.solutions} improvements={self.improvements} "
+            f"max_frontier={self.max_frontier}"
+        )
+
+
+class Frontier(ABC, Generic[T]):
+    """Pending candidates of a branch-and-bound search, each paired with its lower bound"""
+
+    discarded = 0
+    spilled = 0
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def push(self, candidate: BoundedCandidate[T]):
+        ...
+
+    @abstractmethod
+    def pop(self) -> BoundedCandidate[T]:
+        ...
+
+    def ends_level(self) -> bool:
+        """Whether the next pop starts a new level of a level-synchronous search, and so must wait
+        until all children of the current level have been pushed."""
+        return False
+
+    def close(self):
+        pass
+
+
+class QueueFrontier(Frontier[T]):
+    def __init__(self):
+        self.items: Deque[BoundedCandidate[T]] = deque()
+
+    def __len__(self):
+        return len(self.items)
+
+    def push(self, candidate: BoundedCandidate[T]):
+        self.items.append(candidate)
+
+    def pop(self) -> BoundedCandidate[T]:
+        return self.items.popleft()
+
+
+class StackFrontier(QueueFrontier[T]):
+    def pop(self) -> BoundedCandidate[T]:
+        return self.items.pop()
+
+
+class HeapFrontier(Frontier[T]):
+    def __init__(self):
+        self.items: List[Tuple[int, int, T]] = []
+        self.counter = count()
+
+    def __len__(self):
+        return len(self.items)
+
+    def push(self, candidate: BoundedCandidate[T]):
+        bound, value = candidate
+        # ties are broken in insertion order so that candidates themselves are never compared
+        heappush(self.items, (bound, next(self.counter), value))
+
+    def pop(self) -> BoundedCandidate[T]:
+        bound, _, value = heappop(self.items)
+        return bound, value
+
+
+class BeamFrontier(Frontier[T]):
+    """Level-by-level search retaining only the `width` candidates with the best lower bounds at
+    each level. This is a heuristic; the optimal solution may be discarded."""
+
+    def __init__(self, width: int):
+        self.width = width
+        self.level: List[BoundedCandidate[T]] = []
+        self.next_level: List[BoundedCandidate[T]] = []
+        self.discarded = 0
+
+    def __len__(self):
+        return len(self.level) + len(self.next_level)
+
+    def push(self, candidate: BoundedCandidate[T]):
+        self.next_level.append(candidate)
+
+    def pop(self) -> BoundedCandidate[T]:
+        if not self.level:
+            beam = nsmallest(self.width, self.next_level, key=fst)
+            self.discarded += len(self.next_level) - len(beam)
+            self.level, self.next_level = beam[::-1], []
+        return self.level.pop()
+
+    def ends_level(self) -> bool:
+        return not self.level
+
+
+class DepthFirstOverflowFrontier(Frontier[T]):
+    """Once `frontier` holds `max_size` candidates, further candidates are pushed onto a stack
+    which is drained first, so that the search proceeds depth-first until the stack is exhausted.
+    The stack then grows only with the depth of the search rather than its breadth."""
+
+    def __init__(self, frontier: Frontier[T], max_size: int):
+        self.frontier = frontier
+        self.max_size = max_size
+        self.stack: List[BoundedCandidate[T]] = []
+
+    def __len__(self):
+        return len(self.frontier) + len(self.stack)
+
+    @property
+    def discarded(self):  # type: ignore
+        return self.frontier.discarded
+
+    def push(self, candidate: BoundedCandidate[T]):
+        if self.stack or len(self.frontier) >= self.max_size:
+            self.stack.append(candidate)
+        else:
+            self.frontier.push(candidate)
+
+    def pop(self) -> BoundedCandidate[T]:
+        return self.stack.pop() if self.stack else self.frontier.pop()
+
+    def ends_level(self) -> bool:
+        return not self.stack and self.frontier.ends_level()
+
+
+class SpillingFrontier(Frontier[T]):
+    """Holds at most `max_size` candidates in `frontier`; excess candidates are written to disk in
+    pickled batches of `batch_size` and reloaded, oldest first, only when `frontier` runs empty.
+    The search order is thus only approximately that of `frontier`, but pruning is unaffected."""
+
+    def __init__(
+        self,
+        frontier: Frontier[T],
+        max_size: int,
+        batch_size: int = 10_000,
+        directory: Optional[str] = None,
+    ):
+        if batch_size > max_size:
+            raise ValueError(f"batch size {batch_size} exceeds max frontier size {max_size}")
+        self.frontier = frontier
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.buffer: List[BoundedCandidate[T]] = []
+        self.batches: Deque[Tuple[Path, int]] = deque()
+        self.n_on_disk = 0
+        self.spilled = 0
+        self.tempdir = TemporaryDirectory(prefix="branch_and_bound_", dir=directory)
+        self.batch_ids = count()
+
+    def __len__(self):
+        return len(self.frontier) + len(self.buffer) + self.n_on_disk
+
+    @property
+    def discarded(self):  # type: ignore
+        return self.frontier.discarded
+
+    def push(self, candidate: BoundedCandidate[T]):
+        if len(self.frontier) < self.max_size and not self.buffer and not self.batches:
+            self.frontier.push(candidate)
+        else:
+            self.buffer.append(candidate)
+            if len(self.buffer) >= self.batch_size:
+                self._spill()
+
+    def pop(self) -> BoundedCandidate[T]:
+        if not self.frontier:
+            self._reload()
+        return self.frontier.pop()
+
+    def ends_level(self) -> bool:
+        # reloading may push children of the current level
+        return not self.frontier or self.frontier.ends_level()
+
+    def close(self):
+        self.tempdir.cleanup()
+
+    def _spill(self):
+        path = Path(self.tempdir.name) / f"{next(self.batch_ids)}.pkl"
+        with open(path, "wb") as f:
+            pickle.dump(self.buffer, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.batches.append((path, len(self.buffer)))
+        self.n_on_disk += len(self.buffer)
+        self.spilled += len(self.buffer)
+        self.buffer = []
+
+    def _reload(self):
+        if self.batches:
+            path, size = self.batches.popleft()
+            with open(path, "rb") as f:
+                batch = pickle.load(f)
+            path.unlink()
+            self.n_on_disk -= size
+        else:
+            batch, self.buffer = self.buffer, []
+        for candidate in batch:
+            self.frontier.push(candidate)
+
+
+def make_frontier(strategy: SearchStrategy, beam_width: Optional[int] = None) -> Frontier:
+    if strategy == "breadth":
+        return QueueFrontier()
+    elif strategy == "depth":
+        return StackFrontier()
+    elif strategy == "best":
+        return HeapFrontier()
+    elif strategy == "beam":
+        if beam_width is None:
+            raise ValueError("beam search requires a beam width")
+        return BeamFrontier(beam_width)
+    else:
+        raise ValueError(f"Unknown search strategy: {strategy}")
+
+
+class Expansion(NamedTuple, Generic[T]):
+    objective: Optional[int]
+    children: List[BoundedCandidate[T]]
+    n_generated: int
+
+
+def _set_incumbent(incumbent: Optional[Synchronized]):
+    global _INCUMBENT
+    _INCUMBENT = incumbent
+
+
+def _expand(
     candidate_fn: Callable[[T], Iterable[T]],
     stop_fn: Callable[[T], bool],
     objective_fn: Callable[[T], int],
     lower_bound_fn: Callable[[T], int],
-) -> Optional[T]:
-    return _branch_and_bound(
-        candidate_fn,
-        stop_fn,
-        objective_fn,
-        lower_bound_fn,
-        deque(initial),
-        heuristic_solution,
-        objective_fn(heuristic_solution),
-    )
+    objective_upper_bound: int,
+    candidate: T,
+) -> Expansion[T]:
+    incumbent = _INCUMBENT
+    if stop_fn(candidate):
+        objective = objective_fn(candidate)
+        if incumbent is not None:
+            with incumbent.get_lock():
+                if objective < incumbent.value:
+                    incumbent.value = objective
+        return Expansion(objective, [], 0)
+    else:
+        upper_bound = (
+            objective_upper_bound
+            if incumbent is None
+            else min(objective_upper_bound, incumbent.value)
+        )
+        children = list(map(swap, zip_with(lower_bound_fn, candidate_fn(candidate))))
+        viable = [child for child in children if child[0] < upper_bound]
+        return Expansion(None, viable, len(children))
+
+
+def _pop_viable(
+    frontier: Frontier[T], objective_upper_bound: int, n: int, stats: SearchStats
+) -> List[T]:
+    # the incumbent may have improved since these were pushed; prune again before expanding.
+    # a batch never spans levels, since the next level is only complete once it's expanded
+    batch: List[T] = []
+    while frontier and len(batch) < n and not (batch and frontier.ends_level()):
+        bound, candidate = frontier.pop()
+        if bound < objective_upper_bound:
+            batch.append(candidate)
+        else:
+            stats.pruned += 1
+    return batch
 
 
-@tail_recursive
-def _branch_and_bound(
+def branch_and_bound(
+    initial: Iterable[T],
+    heuristic_solution: T,
     candidate_fn: Callable[[T], Iterable[T]],
     stop_fn: Callable[[T], bool],
     objective_fn: Callable[[T], int],
     lower_bound_fn: Callable[[T], int],
-    queue: Deque[T],
-    best_solution: T,
-    objective_upper_bound: int,
+    strategy: SearchStrategy = "breadth",
+    beam_width: Optional[int] = None,
+    workers: Optional[int] = None,
+    batch_size: int = 256,
+    stats: Optional[SearchStats] = None,
+    log_every: int = 100_000,
+    max_frontier: Optional[int] = None,
+    overflow: OverflowPolicy = "depth",
+    spill_batch_size: int = 10_000,
+    spill_dir: Optional[str] = None,
 ) -> Optional[T]:
-    if queue:
-        candidate = queue.popleft()
-        if stop_fn(candidate):
-            objective = objective_fn(candidate)
-            if objective < objective_upper_bound:
-                print_(f"NEW BEST OBJECTIVE: {objective}")
-                best_solution, objective_upper_bound = candidate, objective
-            return _branch_and_bound(
-                candidate_fn,
-                stop_fn,
-                objective_fn,
-                lower_bound_fn,
-                queue,
-                best_solution,
-                objective_upper_bound,
-            )
+    """Minimize `objective_fn` over candidates satisfying `stop_fn`, generated from `initial` by
+    repeated application of `candidate_fn`. Candidates whose `lower_bound_fn` is no better than the
+    best objective found so far are pruned.
+
+    `strategy` is the order of exploration: "breadth"-first, "depth"-first, "best"-first by lower
+    bound, or "beam" search keeping the best `beam_width` candidates of each level.
+    When `workers` is given, batches of `batch_size` candidates are expanded in a process pool
+    sharing the best objective found so far; all functions must then be picklable. Batches of a
+    beam search are cut short at the end of each level, so that levels are still formed whole.
+    Statistics are accumulated into `stats` and logged every `log_every` expansions when verbose.
+
+    To bound memory use, `max_frontier` caps the number of pending candidates held by the search
+    strategy. Beyond the cap, the `overflow` policy either continues "depth"-first, or "spill"s
+    candidates to disk in batches of `spill_batch_size` under `spill_dir`.
+    """
+    frontier = make_frontier(strategy, beam_width)
+    if max_frontier is not None:
+        if overflow == "depth":
+            frontier = DepthFirstOverflowFrontier(frontier, max_frontier)
+        elif overflow == "spill":
+            batch_size_ = min(spill_batch_size, max_frontier)
+            frontier = SpillingFrontier(frontier, max_frontier, batch_size_, spill_dir)
         else:
-            is_viable = compose(lower_bound_fn, objective_upper_bound.__gt__)
-            viable_candidates = filter(is_viable, candidate_fn(candidate))
-            queue.extend(viable_candidates)
-            return _branch_and_bound(
-                candidate_fn,
-                stop_fn,
-                objective_fn,
-                lower_bound_fn,
-                queue,
-                best_solution,
-                objective_upper_bound,
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+    stats_ = SearchStats() if stats is None else stats
+    best_solution, objective_upper_bound = heuristic_solution, objective_fn(heuristic_solution)
+    stats_.best_objective = objective_upper_bound
+    for candidate in initial:
+        frontier.push((lower_bound_fn(candidate), candidate))
+
+    incumbent = None if workers is None else Value("q", objective_upper_bound)
+    executor = (
+        None
+        if workers is None
+        else ProcessPoolExecutor(workers, initializer=_set_incumbent, initargs=(incumbent,))
+    )
+    chunksize = 1 if workers is None else max(1, batch_size // (4 * workers))
+    try:
+        while frontier:
+            n = 1 if executor is None else batch_size
+            batch = _pop_viable(frontier, objective_upper_bound, n, stats_)
+            expand = partial(
+                _expand, candidate_fn, stop_fn, objective_fn, lower_bound_fn, objective_upper_bound
             )
-    else:
-        return best_solution
+            expansions = (
+                map(expand, batch)
+                if executor is None
+                else executor.map(expand, batch, chunksize=chunksize)
+            )
+            for candidate, expansion in zip(batch, expansions):
+                if expansion.objective is not None:
+                    stats_.solutions += 1
+                    if expansion.objective < objective_upper_bound:
+                        best_solution, objective_upper_bound = candidate, expansion.objective
+                        stats_.improvements += 1
+                        stats_.best_objective = objective_upper_bound
+                        print_(f"New best objective; {stats_}")
+                else:
+                    stats_.expanded += 1
+                    stats_.generated += expansion.n_generated
+                    stats_.pruned += expansion.n_generated - len(expansion.children)
+                    for child in expansion.children:
+                        if child[0] < objective_upper_bound:
+                            frontier.push(child)
+                        else:
+                            stats_.pruned += 1
+                    if stats_.expanded % log_every == 0:
+                        print_(stats_)
+            stats_.max_frontier = max(stats_.max_frontier, len(frontier))
+    finally:
+        frontier.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    stats_.discarded = frontier.discarded
+    stats_.spilled = frontier.spilled
+    return best_solution
 
 
 # I/O
@@ -744,13 +1798,220 @@ def print_(*args, **kwargs):
         print(*args, **kwargs, file=sys.stderr)
 
 
-def parse_blocks(input_: Iterable[str], parse: Callable[[str], T]) -> Iterator[T]:
+Buffer = Union[bytes, bytearray, mmap]
+# a line break, a line of only whitespace, and the line break ending it
+BLOCK_SEP = re.compile(rb"\n[ \t\r\f\v]*\n")
+_WHITESPACE = b" \t\r\n\f\v"
+
+
+def read_buffer(input_: IO) -> Buffer:
+    """Memory-map the file underlying `input_` if it is a regular, non-empty file which has not yet
+    been read from; otherwise read it into memory"""
+    try:
+        fileno = input_.fileno()
+        stat = os.fstat(fileno)
+        is_mappable = S_ISREG(stat.st_mode) and stat.st_size > 0 and input_.tell() == 0
+    except (AttributeError, OSError, UnsupportedOperation):
+        is_mappable = False
+    if is_mappable:
+        return mmap(fileno, 0, access=ACCESS_READ)
+    else:
+        raw = input_.read()
+        return raw.encode() if isinstance(raw, str) else raw
+
+
+@contextmanager
+def open_buffer(input_: IO) -> Iterator[Buffer]:
+    """`read_buffer`, closing the memory map, if any, on exit. Views of the buffer must be released
+    by then."""
+    buffer = read_buffer(input_)
+    try:
+        yield buffer
+    finally:
+        if isinstance(buffer, mmap):
+            buffer.close()
+
+
+def buffer_blocks(buffer: Buffer) -> Iterator[memoryview]:
+    """Zero-copy views of the blocks of `buffer` separated by blank or whitespace-only lines,
+    without leading blank lines or trailing whitespace. Lines within a block keep any trailing
+    whitespace; `text_blocks` removes it."""
+    view = memoryview(buffer)
+    size = len(buffer)
+    start = 0
+    while start < size:
+        sep = BLOCK_SEP.search(buffer, start)
+        end, next_start = (size, size) if sep is None else sep.span()
+        first = start
+        while first < end and buffer[first] in _WHITESPACE:
+            first += 1
+        if first < end:
+            # keep indentation of the first line
+            first = buffer.rfind(b"\n", start, first) + 1 or start
+            stop = end
+            while buffer[stop - 1] in _WHITESPACE:
+                stop -= 1
+            yield view[first:stop]
+        start = next_start
+
+
+def text_blocks(buffer: Buffer) -> Iterator[str]:
+    """Blocks of `buffer` separated by blank lines, decoded one block at a time, with trailing
+    whitespace removed from each line as in `line_blocks`"""
+    return (
+        "\n".join(map(str.rstrip, str(block, "utf-8").split("\n")))
+        for block in buffer_blocks(buffer)
+    )
+
+
+def line_blocks(input_: Iterable[str]) -> Iterator[str]:
     block = []
     for line in map(str.rstrip, input_):
         if line:
             block.append(line)
         elif block:
-            yield parse("\n".join(block))
+            yield "\n".join(block)
             block = []
     if block:
-        yield parse("\n".join(block))
+        yield "\n".join(block)
+
+
+def parse_blocks(
+    input_: Union[Iterable[str], Buffer],
+    parse: Callable[[str], T],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+) -> Iterator[T]:
+    """Parse blocks of text separated by blank lines, from either lines of text or a buffer as
+    returned by `read_buffer`. Blocks are parsed in parallel if `workers` is given; see
+    `parallel_map`."""
+    blocks = (
+        text_blocks(input_) if isinstance(input_, (bytes, bytearray, mmap)) else line_blocks(input_)
+    )
+    return parallel_map(parse, blocks, workers, chunksize)
+
+
+# Parallelism
+
+
+def parallel_map(
+    f: Callable[[T], U],
+    items: Iterable[T],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+) -> Iterator[U]:
+    """`map(f, items)`, computed in a pool of `workers` processes if given, with `chunksize` items
+    sent to a worker at a time. Results are in order. For a pool, `f` and `items` must be
+    picklable; `items` is consumed a bounded number of chunks ahead of the results. The default
+    `chunksize` suits many small items; with few, expensive items, use a smaller one so that they
+    are spread over the workers."""
+    if workers is None:
+        return map(f, items)
+    else:
+        return _parallel_map(f, items, workers, chunksize)
+
+
+ByteRange = Tuple[int, int]
+# a chunk of input for a worker: a file path and byte range to map, or the bytes themselves
+ChunkSource = Union[Tuple[str, ByteRange], bytes]
+
+
+def line_aligned_ranges(buffer: Buffer, n_chunks: int) -> List[ByteRange]:
+    """Split `buffer` into at most `n_chunks` contiguous, non-empty byte ranges of roughly equal
+    size, each ending at a line boundary"""
+    size = len(buffer)
+    bounds = [0]
+    for k in range(1, n_chunks):
+        newline = buffer.find(b"\n", max(k * size // n_chunks, bounds[-1]))
+        if newline < 0:
+            break
+        elif newline + 1 < size and newline + 1 > bounds[-1]:
+            bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def _file_path(input_: IO) -> Optional[str]:
+    """Absolute path of the file open as `input_`, if its name is a path to that same file; not so
+    for e.g. stdin redirected from a file, named '<stdin>'"""
+    name = getattr(input_, "name", None)
+    if not isinstance(name, str):
+        return None
+    try:
+        is_same_file = os.path.samestat(os.stat(name), os.fstat(input_.fileno()))
+    except (OSError, UnsupportedOperation):
+        return None
+    return os.path.abspath(name) if is_same_file else None
+
+
+def _chunk_sources(input_: IO, n_chunks: int) -> List[ChunkSource]:
+    with open_buffer(input_) as buffer:
+        ranges = line_aligned_ranges(buffer, n_chunks)
+        path = _file_path(input_) if isinstance(buffer, mmap) else None
+        if path is None:
+            return [bytes(buffer[start:stop]) for start, stop in ranges]
+        else:
+            # workers map the file themselves; only the path and offsets are sent to them
+            return [(path, byte_range) for byte_range in ranges]
+
+
+def _map_reduce_chunk(
+    f: Callable[[str], T], reduce_fn: Callable[[T, T], T], source: ChunkSource
+) -> Optional[T]:
+    if isinstance(source, bytes):
+        data = source
+    else:
+        path, (start, stop) = source
+        with open(path, "rb") as file, mmap(file.fileno(), 0, access=ACCESS_READ) as buffer:
+            data = buffer[start:stop]
+    values = map(f, filter(None, map(str.strip, str(data, "utf-8").splitlines())))
+    return _reduce_nonempty(reduce_fn, values)
+
+
+def _reduce_nonempty(reduce_fn: Callable[[T, T], T], values: Iterable[T]) -> Optional[T]:
+    values_ = iter(values)
+    first_ = next(values_, None)
+    return None if first_ is None else reduce(reduce_fn, values_, first_)
+
+
+def parallel_map_reduce(
+    f: Callable[[str], T],
+    reduce_fn: Callable[[T, T], T],
+    input_: IO,
+    workers: int,
+    chunks_per_worker: int = 4,
+) -> Optional[T]:
+    """Reduce `f` applied to each non-blank line of `input_`, splitting the input into
+    `chunks_per_worker` byte ranges per worker, aligned to line boundaries, to be processed in a
+    pool of `workers` processes. `reduce_fn` must be associative, and `f` and `reduce_fn` must be
+    picklable. Each worker imports the module defining `f` once. Returns None for empty input."""
+    sources = _chunk_sources(input_, workers * chunks_per_worker)
+    with ProcessPoolExecutor(workers) as executor:
+        results = executor.map(partial(_map_reduce_chunk, f, reduce_fn), sources)
+        return _reduce_nonempty(reduce_fn, (r for r in results if r is not None))
+
+
+def parallel_sum(f: Callable[[str], int], input_: IO, workers: int) -> int:
+    """Sum of `f` applied to each non-blank line of `input_`; see `parallel_map_reduce`"""
+    total = parallel_map_reduce(f, add, input_, workers)
+    return 0 if total is None else total
+
+
+def _map_chunk(f: Callable[[T], U], chunk: List[T]) -> List[U]:
+    return list(map(f, chunk))
+
+
+def _parallel_map(
+    f: Callable[[T], U], items: Iterable[T], workers: int, chunksize: int
+) -> Iterator[U]:
+    chunks = chunked(chunksize, items)
+    with ProcessPoolExecutor(workers) as executor:
+        # keep 4 chunks per worker in flight, submitting one more as each result is taken, so that
+        # workers stay busy while results are consumed
+        pending: Deque[Future[List[U]]] = deque(
+            executor.submit(_map_chunk, f, chunk) for chunk in islice(chunks, 4 * workers)
+        )
+        while pending:
+            results = pending.popleft().result()
+            pending.extend(executor.submit(_map_chunk, f, chunk) for chunk in islice(chunks, 1))
+            yield from results
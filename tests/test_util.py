@@ -1,4 +1,11 @@
+import io
 import operator
+import os
+import subprocess
+import sys
+from functools import partial
+from itertools import permutations, product
+from operator import itemgetter
 
 import pytest
 
@@ -40,3 +47,420 @@ def same_parity(a, b):
 def test_reduce_while(op, agg, values, init, expected):
     actual = list(util.reduce_while(op, agg, values, init))
     assert expected == actual, (expected, actual)
+
+
+ASSIGNMENT_COSTS = [
+    [9, 2, 7, 8, 6],
+    [6, 4, 3, 7, 5],
+    [5, 8, 1, 8, 4],
+    [7, 6, 9, 4, 3],
+    [2, 5, 6, 3, 8],
+]
+
+
+def assignment_candidates(costs, assignment):
+    return [(*assignment, j) for j in range(len(costs)) if j not in assignment]
+
+
+def assignment_complete(costs, assignment):
+    return len(assignment) == len(costs)
+
+
+def assignment_cost(costs, assignment):
+    return sum(costs[i][j] for i, j in enumerate(assignment))
+
+
+def assignment_lower_bound(costs, assignment):
+    remaining = [j for j in range(len(costs)) if j not in assignment]
+    return assignment_cost(costs, assignment) + sum(
+        min(row[j] for j in remaining) for row in costs[len(assignment) :]  # noqa: E203
+    )
+
+
+@pytest.mark.parametrize(
+    "strategy, beam_width, workers, max_frontier, overflow",
+    [
+        ("breadth", None, None, None, "depth"),
+        ("depth", None, None, None, "depth"),
+        ("best", None, None, None, "depth"),
+        ("beam", 1000, None, None, "depth"),
+        ("best", None, 2, None, "depth"),
+        ("breadth", None, None, 4, "depth"),
+        ("breadth", None, None, 4, "spill"),
+        ("best", None, 2, 4, "spill"),
+    ],
+)
+def test_branch_and_bound(strategy, beam_width, workers, max_frontier, overflow):
+    costs = ASSIGNMENT_COSTS
+    expected = min(
+        map(partial(assignment_cost, costs), permutations(range(len(costs)))),
+    )
+    stats = util.SearchStats()
+    solution = util.branch_and_bound(
+        [()],
+        tuple(range(len(costs))),
+        partial(assignment_candidates, costs),
+        partial(assignment_complete, costs),
+        partial(assignment_cost, costs),
+        partial(assignment_lower_bound, costs),
+        strategy=strategy,
+        beam_width=beam_width,
+        workers=workers,
+        stats=stats,
+        max_frontier=max_frontier,
+        overflow=overflow,
+        spill_batch_size=2,
+    )
+    assert assignment_cost(costs, solution) == expected
+    assert stats.best_objective == expected
+    assert stats.expanded > 0
+    if overflow == "spill":
+        assert stats.spilled > 0
+
+
+def test_branch_and_bound_beam_levels_with_workers():
+    # solutions all lie on the last level, so a level-synchronous search expands and discards
+    # the same candidates whether or not batches are expanded in parallel
+    costs = ASSIGNMENT_COSTS
+    args = (
+        [()],
+        tuple(range(len(costs))),
+        partial(assignment_candidates, costs),
+        partial(assignment_complete, costs),
+        partial(assignment_cost, costs),
+        partial(assignment_lower_bound, costs),
+    )
+    serial, parallel = util.SearchStats(), util.SearchStats()
+    util.branch_and_bound(*args, strategy="beam", beam_width=6, stats=serial)
+    util.branch_and_bound(
+        *args, strategy="beam", beam_width=6, workers=2, batch_size=4, stats=parallel
+    )
+    assert serial.discarded > 0
+    assert (parallel.expanded, parallel.generated, parallel.discarded) == (
+        serial.expanded,
+        serial.generated,
+        serial.discarded,
+    )
+
+
+@pytest.mark.parametrize(
+    "f, initial",
+    [
+        (lambda n: (n * n + 1) % 255, 3),
+        (lambda n: (n + 1) % 7, 0),
+        (lambda n: min(n + 1, 5), 0),
+    ],
+)
+def test_find_cycle_brent(f, initial):
+    expected = util.find_cycle(util.identity, util.iterate(f, initial))
+    actual = util.find_cycle_brent(util.identity, f, initial)
+    assert actual.offset == expected.offset
+    assert len(actual) == len(expected)
+    assert [actual[i] for i in range(100)] == [expected[i] for i in range(100)]
+
+
+def test_fingerprint():
+    rows = ["#..O", ".O#.", "O..#"]
+    assert len(util.fingerprint(rows)) == util.FINGERPRINT_SIZE
+    assert util.fingerprint(rows) == util.fingerprint(map(str.encode, rows))
+    assert util.fingerprint(rows) != util.fingerprint(rows[::-1])
+    assert util.fingerprint(["ab", "c"]) != util.fingerprint(["a", "bc"])
+
+
+def test_find_cycle_verify():
+    states = [0, 1, 2, 3, 4, 5]
+    with pytest.raises(ValueError):
+        util.find_cycle(lambda n: n % 3, states, verify=operator.eq)
+    state_cycle = util.find_cycle(lambda n: n % 3, states)
+    assert state_cycle.offset == 0 and len(state_cycle) == 3
+
+
+@pytest.mark.parametrize("tile_size", [1, 3, 64])
+def test_tiled_grid(tile_size):
+    coords = [(0, 0), (-5, 7), (4, -3), (10, 10), (2, 2), (-5, 7)]
+    grid = util.TiledGrid(tile_size)
+    sparse = util.SparseGrid[int]({})
+    grid.set_all(1, coords[:3]).set(2, coords[3])
+    sparse.set_all(1, coords[:3]).set(2, coords[3])
+    assert grid.bounding_box() == (sparse.x_min, sparse.x_max, sparse.y_min, sparse.y_max)
+    assert (grid.n_rows, grid.n_cols) == (sparse.n_rows, sparse.n_cols)
+    assert all(grid.get(c) == sparse.get(c) for c in coords + [(1, 1), (100, -100)])
+    assert sorted(grid.region()) == sorted(sparse.grid.items())
+    assert sorted(grid.region((-5, 4, -3, 7))) == [((-5, 7), 1), ((0, 0), 1), ((4, -3), 1)]
+
+    grid.set_region(3, (-1, 1, -2, 2))
+    assert len(grid) == 4 + 15 - 1
+    assert grid.get((1, -2)) == 3 and grid.get((0, 0)) == 3 and (2, 2) not in grid
+    assert grid.bounding_box() == (-5, 10, -3, 10)
+
+    with pytest.raises(ValueError):
+        grid.set(grid.missing, (20, 20))
+    with pytest.raises(ValueError):
+        grid.set_region(grid.missing, (20, 21, 20, 21))
+    assert grid.bounding_box() == (-5, 10, -3, 10)
+
+
+@pytest.mark.parametrize(
+    "input_", [io.StringIO("ab.\n.cd\n"), io.BytesIO(b"ab.\r\n.cd\r\n"), io.StringIO("ab.\n.cd")]
+)
+def test_read_grid(input_):
+    grid = util.read_grid(input_)
+    assert grid.shape == (2, 3)
+    assert str(grid) == "ab.\n.cd"
+    assert grid[1, 2] == ord("d") and grid[1][1] == ord("c")
+    assert grid.column(2).tobytes() == b".d"
+    assert str(grid.transpose()) == "a.\nbc\n.d"
+    assert list(grid.indices(b".")) == [2, 3]
+
+
+def test_dense_grid():
+    grid = util.DenseGrid.from_lines(["...#", "#...", "..#."])
+    assert grid.shape == (3, 4)
+    assert grid.transpose().transpose() == grid
+    assert grid.transpose().row(2).tobytes() == grid.column(2).tobytes() == b"..#"
+    assert grid[-1, 2] == grid[2, -2] == grid[2, 2] == ord("#")
+    assert grid[-3, -1] == grid[0, 3] == ord("#")
+    for coords in [(3, 0), (0, 4), (-4, 0), (0, -5)]:
+        with pytest.raises(IndexError):
+            grid[coords]
+    assert list(grid.neighbors(0)) == [1, 4]
+    assert sorted(grid.neighbors(5, diagonal=True)) == [0, 1, 2, 4, 6, 8, 9, 10]
+
+
+@pytest.mark.parametrize("lines", [["ab", "cdef"], ["abc", "de", "fghi"], ["ab", "", "cd"]])
+def test_dense_grid_ragged(lines):
+    with pytest.raises(ValueError):
+        util.DenseGrid.from_lines(lines)
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (3, 2), (5, 7)])
+def test_neighbor_table(width, height):
+    grid = util.DenseGrid(bytearray(width * height), width)
+    table = util.neighbor_table(width, height)
+    for ix in range(width * height):
+        i, j = grid.coords(ix)
+        for direction, (di, dj), offset in zip(
+            table, util.DIRECTIONS, util.direction_offsets(width)
+        ):
+            in_bounds = 0 <= i + di < height and 0 <= j + dj < width
+            expected = ix + offset if in_bounds else util.NO_NEIGHBOR
+            assert direction[ix] == expected
+        assert sorted(n for n in map(itemgetter(ix), table) if n >= 0) == sorted(grid.neighbors(ix))
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        ["#....", ".....", "....#", "....."],
+        ["..", ".#"],
+        ["#"],
+        [".#..#.", "......", "#....#"],
+    ],
+)
+def test_dilate(rows):
+    grid = util.DenseGrid.from_lines(rows)
+    width, height = grid.width, grid.height
+    mask = util.bitmask(grid.data, b"#")
+    expected = {
+        (i, j)
+        for i, j in product(range(height), range(width))
+        if grid[i, j] == ord("#")
+        or any(grid[c] == ord("#") for c in util.adjacent_coords((i, j), width, height))
+    }
+    cells = util.unpack_bitmask(util.dilate(mask, width, height), width * height)
+    assert {grid.coords(ix) for ix, cell in enumerate(cells) if cell} == expected
+
+
+def test_spans_adjacent_to():
+    width, height = 6, 4
+    spans = [((0, 0), 1), ((1, 2), 3), ((3, 4), 2), ((2, 0), 6), ((3, 0), 2)]
+    marked = {(0, 5), (3, 2)}
+    mask = sum(1 << (i * width + j) for i, j in marked)
+    expected = [
+        any(c in marked for c in util.adjacent_coords(coords, width, height, len_))
+        for coords, len_ in spans
+    ]
+    assert util.spans_adjacent_to(mask, width, height, spans) == expected
+    assert True in expected and False in expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "a b\nc\n\nd\n\n\ne f\ng\n",
+        "\n\na\n\nb",
+        "a  \nb\r\n\r\nc\r\n",
+        "",
+        "a\n  \nb\n",
+        " \t\n  x  \ny\n \t \n\n  z\n",
+    ],
+)
+def test_parse_blocks_buffer(text, tmp_path):
+    expected = list(util.parse_blocks(io.StringIO(text), util.identity))
+    assert list(util.parse_blocks(text.encode(), util.identity)) == expected
+    path = tmp_path / "input.txt"
+    path.write_bytes(text.encode())
+    with open(path) as f, util.open_buffer(f) as buffer:
+        assert list(util.parse_blocks(buffer, util.identity)) == expected
+    assert getattr(buffer, "closed", True)
+
+
+@pytest.mark.parametrize("workers, chunksize", [(None, 1), (2, 1), (3, 7)])
+def test_parallel_map(workers, chunksize):
+    items = list(range(100))
+    assert list(util.parallel_map(str, items, workers, chunksize)) == list(map(str, items))
+    blocks = "\n\n".join(map(str, items)).encode()
+    assert list(util.parse_blocks(blocks, int, workers, chunksize)) == items
+
+
+@pytest.mark.parametrize("n_chunks", [1, 2, 3, 10])
+def test_line_aligned_ranges(n_chunks):
+    buffer = b"1\n22\n333\n4444\n55555\n"
+    ranges = util.line_aligned_ranges(buffer, n_chunks)
+    assert len(ranges) <= n_chunks
+    assert b"".join(buffer[start:stop] for start, stop in ranges) == buffer
+    assert all(buffer[stop - 1 : stop] == b"\n" for _, stop in ranges)  # noqa: E203
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_parallel_sum(workers, tmp_path):
+    lines = [str(n) for n in range(1000)]
+    path = tmp_path / "input.txt"
+    path.write_text("\n".join(lines))
+    with open(path) as f:
+        assert util.parallel_sum(int, f, workers) == sum(range(1000))
+    assert util.parallel_sum(int, io.StringIO("\n".join(lines)), workers) == sum(range(1000))
+    assert util.parallel_sum(int, io.StringIO(""), workers) == 0
+
+
+def test_window_slices():
+    data = bytearray(b"abcde")
+    windows = list(util.window_slices(3, data))
+    assert [bytes(w) for w in windows] == [b"abc", b"bcd", b"cde"]
+    data[2] = ord("X")
+    assert bytes(windows[0]) == b"abX"
+    assert list(util.window_slices(2, [1, 2, 3])) == [[1, 2], [2, 3]]
+    assert [bytes(c) for c in util.chunked_slices(2, b"abcde")] == [b"ab", b"cd", b"e"]
+    assert list(util.chunked_slices(2, [])) == []
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5])
+def test_sliding_reductions(size: int):
+    values = [3, 1, 4, 1, 5, 9, 2, 6, 0]
+    windows = list(map(list, util.window(size, values)))
+    assert util.sliding_sum(size, values) == list(map(sum, windows))
+    assert util.sliding_min(size, values) == list(map(min, windows))
+    assert util.sliding_max(size, values) == list(map(max, windows))
+    assert util.sliding_all(size, values) == list(map(all, windows))
+    assert util.sliding_any(size, values) == list(map(any, windows))
+
+
+def test_lcm_gcd_all():
+    assert util.lcm_all([4, 6, 10]) == 60
+    assert util.gcd_all([12, 18, 30]) == 6
+    assert util.lcm_all([]) == 1
+
+
+@pytest.mark.parametrize(
+    "congruences",
+    [
+        [(2, 3), (3, 5), (2, 7)],
+        [(1, 4), (3, 6)],
+        [(0, 4), (1, 6)],
+        [(5, 12), (11, 18), (2, 9)],
+    ],
+)
+def test_solve_congruences(congruences):
+    modulus = util.lcm_all(m for _, m in congruences)
+    expected = [x for x in range(modulus) if all(x % m == r % m for r, m in congruences)]
+    solution = util.solve_congruences(util.Congruence(*c) for c in congruences)
+    if expected:
+        assert solution == (expected[0], modulus)
+        assert solution.first_at_least(100) == min(
+            x for x in range(100, 100 + modulus) if x % modulus == expected[0]
+        )
+    else:
+        assert solution is None
+
+
+def test_djikstra_distances():
+    graph = {"a": {"b": 1, "c": 4}, "b": {"c": 2}, "c": {}, "d": {"a": 1}}
+    assert util.djikstra(graph, "a", "c") == (["a", "b", "c"], 3)
+    path, dist = util.djikstra(graph, "a", "d")
+    assert path == [] and dist is util.INF
+    assert util.floyd_warshall(graph) == {
+        "a": {"b": 1, "c": 3},
+        "b": {"c": 2},
+        "c": {},
+        "d": {"a": 1, "b": 2, "c": 4},
+    }
+
+
+def _tree(id_, data, *children):
+    return util.Tree(id_, data, {c.id: c for c in children})
+
+
+def test_dfs_tree_acc():
+    tree = _tree("/", 1, _tree("a", 2, _tree("b", 3), _tree("c", 4)), _tree("d", 5))
+    paths = [("/",), ("/", "a"), ("/", "a", "b"), ("/", "a", "c"), ("/", "d")]
+    assert [p for p, _ in util.dfs(tree)] == paths
+    assert [link.path() for link, _ in util.dfs_links(tree)] == paths
+    totals = util.tree_acc(tree, str, operator.add)
+    assert [t.data for _, t in util.dfs(totals)] == ["12345", "234", "3", "4", "5"]
+
+
+def test_deep_tree():
+    depth = 100_000
+    tree = leaf = _tree(0, 1)
+    for i in range(1, depth):
+        leaf.children[i] = leaf = _tree(i, 1)
+    *_, (link, last) = util.dfs_links(tree)
+    assert last is leaf and link.path() == tuple(range(depth))
+    assert util.tree_acc(tree, util.identity, operator.add).data == depth
+
+
+def test_trie():
+    words = ["car", "card", "care", "cat", "do", "dog"]
+    trie = util.Trie(reversed(words))
+    assert list(trie) == words and len(trie) == 6
+    assert "car" in trie and "ca" not in trie and "cow" not in trie
+    assert list(trie.with_prefix("car")) == ["car", "card", "care"]
+    assert list(trie.with_prefix("x")) == []
+    assert list(trie.prefixes_of("cards")) == [3, 4]
+    assert trie.longest_match("xdogs", 1) == 4 and trie.longest_match("cow") is None
+    assert list(trie.all_matches("a dog")) == [(2, 4), (2, 5)]
+    assert trie.is_leaf(trie.find("card")) and not trie.is_leaf(trie.find("car"))
+
+
+def test_fenwick_tree_2d():
+    grid = [[3, 0, 1], [2, 5, 0], [0, 4, 7], [1, 1, 1]]
+    tree = util.FenwickTree2D(4, 3)
+    for i, j in product(range(4), range(3)):
+        tree.add(i, j, grid[i][j])
+    for rows, cols in product(range(6), range(5)):
+        assert tree.prefix_sum(rows, cols) == sum(sum(row[:cols]) for row in grid[:rows])
+
+
+def test_parallel_sum_redirected_stdin(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("".join(f"{i}\n" for i in range(100)))
+    script = "import sys, util; print(util.parallel_sum(int, sys.stdin, 2))"
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(util.__file__)}
+    with open(path) as stdin:
+        result = subprocess.run(
+            [sys.executable, "-c", script], stdin=stdin, env=env, capture_output=True, text=True
+        )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == str(sum(range(100)))
+
+
+def test_frontier_is_abstract():
+    class NoPop(util.Frontier):
+        def __len__(self):
+            return 0
+
+        def push(self, candidate):
+            pass
+
+    with pytest.raises(TypeError):
+        NoPop()